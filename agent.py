@@ -0,0 +1,217 @@
+"""Production sampling agent: continuous CPU attribution for a long-running service.
+
+    import agent
+    agent.start(service="checkout-api")  # sends to ENERGY_PROFILER_COLLECTOR, or 127.0.0.1:8765
+
+A daemon thread wakes `rate` times a second, reads each thread's CPU clock
+and samples the stacks of only the threads that used CPU since the last
+tick, charging each stack that CPU time; a blocked thread costs one clock
+read. Every `flush_interval` seconds the samples are collapsed into a
+pstats-style delta and sent as one JSON line to the collector
+(collector.py) over a Unix socket or TCP. While the collector is
+unreachable the samples are kept and go out with the next flush that
+succeeds. Besides the standard library the agent needs only
+sampling_profiler.py from this repository, which itself imports nothing
+else, so shipping the two files adds nothing to a service's dependencies.
+
+Per-thread CPU clocks are read on Linux; elsewhere every thread's stack is
+sampled and charged wall-clock time, idle threads included.
+"""
+import atexit, json, os, socket, sys, threading, time
+from collections import Counter
+from sampling_profiler import DEFAULT_MAX_DEPTH, collapse_stacks, walk_stack
+
+DEFAULT_ADDRESS = os.environ.get("ENERGY_PROFILER_COLLECTOR", "127.0.0.1:8765")
+DEFAULT_RATE = 19             # Hz; a prime rate doesn't fall into step with periodic work
+DEFAULT_FLUSH_INTERVAL = 10.0
+MAX_PENDING_STACKS = 50000    # distinct stacks held while the collector is unreachable; beyond this they're dropped
+SEND_TIMEOUT = 1.0
+THREAD_CLOCKS = sys.platform.startswith("linux")
+
+
+def parse_address(address):
+    """(family, address) for "unix:/path", "/path", "host:port" or "[v6 host]:port"."""
+    if address.startswith("unix:"):
+        return socket.AF_UNIX, address[len("unix:"):]
+    if address.startswith("/"):
+        return socket.AF_UNIX, address
+    host, _, port = address.rpartition(":")
+    if host.startswith("["):
+        return socket.AF_INET6, (host[1:-1], int(port))
+    return socket.AF_INET, (host or "127.0.0.1", int(port))
+
+
+def connect(address, timeout=SEND_TIMEOUT):
+    """A stream socket connected to a collector address."""
+    family, target = parse_address(address)
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.settimeout(timeout)
+    try:
+        sock.connect(target)
+    except OSError:
+        sock.close()
+        raise
+    return sock
+
+
+def encode_stats(stats):
+    """A pstats-style dict as JSON lists: [file, line, func, calls, tt, ct, [[caller file, line, func, calls, tt, ct], ...]]."""
+    return [[*key, nc, tt, ct, [[*caller, edge[1], edge[2], edge[3]] for caller, edge in callers.items()]]
+            for key, (_, nc, tt, ct, callers) in stats.items()]
+
+
+def decode_stats(functions):
+    """The pstats-style dict back from `encode_stats` lists."""
+    stats = {}
+    for filename, line, func, nc, tt, ct, callers in functions:
+        stats[(filename, line, func)] = (nc, nc, tt, ct, {(f, l, n): (c, c, t, i) for f, l, n, c, t, i in callers})
+    return stats
+
+
+def thread_clock(native_id):
+    # glibc's MAKE_THREAD_CPUCLOCK(tid, CPUCLOCK_SCHED): the kernel's CPU clock of one thread, addressed
+    # by its TID. Unlike pthread_getcpuclockid this can't touch a thread that has already exited; reading
+    # the clock of a gone TID just fails with EINVAL.
+    return (~native_id << 3) | 6
+
+
+class Agent:
+    """Samples every thread of this process and flushes deltas to a collector; see the module docstring."""
+
+    def __init__(self, service=None, address=DEFAULT_ADDRESS, rate=DEFAULT_RATE,
+                 flush_interval=DEFAULT_FLUSH_INTERVAL, max_depth=DEFAULT_MAX_DEPTH):
+        self.service = service or os.path.basename(sys.argv[0]) or "python"
+        self.address = address
+        self.rate = rate
+        self.flush_interval = flush_interval
+        self.max_depth = max_depth
+        self.clock = "cpu" if THREAD_CLOCKS else "wall"
+        self.dropped = 0
+        self._samples = Counter()
+        self._seconds = Counter()
+        self._thread_cpu = {}
+        self._native_ids = {}
+        self._sock = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="energy-agent", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self, timeout=SEND_TIMEOUT * 2):
+        """Stops sampling after a last flush."""
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _run(self):
+        interval = 1.0 / self.rate
+        codes = {}
+        self._last_tick = self._flushed_at = time.perf_counter()
+        self._flushed_cpu, self._flushed_agent = time.process_time(), time.thread_time()
+        while not self._stop.wait(interval):
+            self._tick(codes)
+            if time.perf_counter() - self._flushed_at >= self.flush_interval:
+                self.flush()
+        self.flush()
+        if self._sock is not None:
+            self._sock.close()
+            self._sock = None
+
+    def _tick(self, codes):
+        now = time.perf_counter()
+        wall, self._last_tick = now - self._last_tick, now
+        me = threading.get_ident()
+        frames = sys._current_frames()
+        if self.clock == "cpu":
+            native_ids = {thread.ident: thread.native_id for thread in threading.enumerate()}
+            native_ids.update(self._native_ids)
+            previous, self._thread_cpu = self._thread_cpu, {}
+        for ident, frame in frames.items():
+            if ident == me:
+                continue
+            seconds = wall
+            if self.clock == "cpu":
+                native_id = native_ids.get(ident)
+                if native_id is None:
+                    continue  # a thread started outside `threading`; its CPU clock is unknown
+                try:
+                    cpu = time.clock_gettime(thread_clock(native_id))
+                except OSError:
+                    continue
+                self._thread_cpu[native_id] = cpu
+                seconds = cpu - previous.get(native_id, cpu)
+                if seconds <= 0:
+                    continue  # blocked since the last tick
+            stack, _ = walk_stack(frame, codes, max_depth=self.max_depth)
+            if stack:
+                self._samples[stack] += 1
+                self._seconds[stack] += seconds
+
+    def flush(self):
+        """Sends the samples since the last successful flush; on failure keeps them for the next one."""
+        now, cpu, agent_cpu = time.perf_counter(), time.process_time(), time.thread_time()
+        message = {
+            "type": "delta", "service": self.service, "host": socket.gethostname(), "pid": os.getpid(),
+            "clock": self.clock, "rate": self.rate, "wall": now - self._flushed_at,
+            "cpu": cpu - self._flushed_cpu, "agent": agent_cpu - self._flushed_agent,
+            "samples": sum(self._samples.values()), "dropped": self.dropped,
+            "functions": encode_stats(collapse_stacks(self._samples, 0.0, self._seconds)),
+        }
+        try:
+            if self._sock is None:
+                self._sock = connect(self.address)
+            self._sock.sendall(json.dumps(message, separators=(",", ":")).encode("utf-8") + b"\n")
+        except OSError:
+            if self._sock is not None:
+                self._sock.close()
+                self._sock = None
+            if len(self._samples) > MAX_PENDING_STACKS:
+                self.dropped += sum(self._samples.values())
+                self._samples.clear()
+                self._seconds.clear()
+            return False
+        self._samples.clear()
+        self._seconds.clear()
+        self.dropped = 0
+        self._flushed_at, self._flushed_cpu, self._flushed_agent = now, cpu, agent_cpu
+        return True
+
+
+_agent = None
+
+
+def start(service=None, address=DEFAULT_ADDRESS, rate=DEFAULT_RATE, flush_interval=DEFAULT_FLUSH_INTERVAL):
+    """Starts this process's agent, once; forked children get an agent of their own."""
+    global _agent
+    if _agent is None:
+        _agent = Agent(service, address, rate, flush_interval).start()
+    return _agent
+
+
+def stop():
+    """Stops the agent after a last flush."""
+    global _agent
+    if _agent is not None:
+        _agent.stop()
+        _agent = None
+
+
+def _restart_in_child():
+    # The sampling thread doesn't survive fork, and the parent's samples are the parent's to send.
+    global _agent
+    if _agent is not None:
+        parent = _agent
+        _agent = Agent(parent.service, parent.address, parent.rate, parent.flush_interval, parent.max_depth)
+        # threading can leave the forking thread's native_id at the parent's TID (seen on 3.11)
+        _agent._native_ids[threading.get_ident()] = threading.get_native_id()
+        _agent.start()
+
+
+atexit.register(stop)
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_restart_in_child)
@@ -0,0 +1,191 @@
+"""Asynchronous AI optimization client: cached, coalesced, with timeouts and retry with backoff.
+
+Requests run on a background event loop, so the Streamlit script thread
+only holds a concurrent.futures.Future and never blocks on the model.
+Backends are pluggable: Gemini, or any HTTP server speaking the tiny JSON
+protocol of HttpBackend (e.g. a local stub model for tests).
+"""
+import asyncio, hashlib, json, math, os, random, re, threading, urllib.request
+from collections import OrderedDict
+
+DEFAULT_MODEL = os.environ.get("ENERGY_PROFILER_AI_MODEL", "gemini-2.5-flash")
+DEFAULT_TIMEOUT = 60.0
+DEFAULT_RETRIES = 3
+DEFAULT_BACKOFF = 1.0
+DEFAULT_CACHE_ITEMS = 128
+ENERGY_BUCKETS_PER_DECADE = 4
+
+
+class AIConfigError(RuntimeError):
+    """No backend is configured (e.g. the API key is missing)."""
+
+
+def build_prompt(original_code, joules):
+    return f"""
+    You are a Green Computing expert. The following Python code used {joules:.6f} Joules.
+    1. Identify the 'Energy Hotspot' (the most inefficient part).
+    2. Provide an optimized version of the entire script.
+    3. Explain why the fix reduces CPU cycles.
+
+    Return the optimized code inside a standard ```python ``` block.
+
+    Original Code:
+    {original_code}
+    """
+
+
+def build_hotspot_prompt(excerpt, joules):
+    return f"""
+    You are a Green Computing expert. A Python program used {joules:.6f} Joules. Below are its
+    energy hotspots (the functions that spent that energy) and the code they depend on.
+    1. Identify the most inefficient part of each hotspot.
+    2. Rewrite the hotspot functions, keeping their names and signatures.
+    3. Explain why the fix reduces CPU cycles.
+
+    Return only the complete rewritten hotspot functions (methods inside their class) and any
+    imports they need, inside a standard ```python ``` block.
+
+    Hotspots:
+    {excerpt}
+    """
+
+
+def extract_code(content):
+    """The first ```python block of a response, or None."""
+    match = re.search(r"```python\n(.*?)```", content, re.DOTALL)
+    return match.group(1).strip() if match else None
+
+
+def energy_bucket(joules):
+    """Quarter-decade bucket of an energy figure: reruns with jitter share a cache entry."""
+    if not joules or joules <= 0:
+        return None
+    return math.floor(math.log10(joules) * ENERGY_BUCKETS_PER_DECADE)
+
+
+def request_key(code, joules):
+    return hashlib.sha256(code.encode("utf-8")).hexdigest(), energy_bucket(joules)
+
+
+class GeminiBackend:
+    """Google Gemini through google-generativeai's native async API."""
+
+    def __init__(self, api_key, model=DEFAULT_MODEL):
+        import google.generativeai as genai  # only needed when this backend is used
+        genai.configure(api_key=api_key)
+        self.model = genai.GenerativeModel(model)
+
+    async def generate(self, prompt):
+        response = await self.model.generate_content_async(prompt)
+        return response.text
+
+
+class HttpBackend:
+    """POSTs {"model", "prompt"} as JSON to `url` and reads {"text"} back.
+
+    `timeout` bounds the socket itself: AIClient's timeout stops waiting for
+    the worker thread, but only this ends the request.
+    """
+
+    def __init__(self, url, model=DEFAULT_MODEL, timeout=DEFAULT_TIMEOUT):
+        self.url = url
+        self.model = model
+        self.timeout = timeout
+
+    def _post(self, prompt):
+        body = json.dumps({"model": self.model, "prompt": prompt}).encode("utf-8")
+        request = urllib.request.Request(self.url, body, {"Content-Type": "application/json"})
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            return json.loads(response.read())["text"]
+
+    async def generate(self, prompt):
+        return await asyncio.to_thread(self._post, prompt)
+
+
+def backend_from_config(api_key=None, url=None, model=DEFAULT_MODEL, timeout=DEFAULT_TIMEOUT):
+    """HttpBackend if a URL is configured, else Gemini with the given or environment API key.
+
+    Environment: ENERGY_PROFILER_AI_URL, GEMINI_API_KEY, ENERGY_PROFILER_AI_MODEL.
+    """
+    url = url or os.environ.get("ENERGY_PROFILER_AI_URL")
+    if url:
+        return HttpBackend(url, model, timeout)
+    api_key = api_key or os.environ.get("GEMINI_API_KEY")
+    if not api_key:
+        raise AIConfigError("set GEMINI_API_KEY (environment or Streamlit secrets) or ENERGY_PROFILER_AI_URL")
+    return GeminiBackend(api_key, model)
+
+
+class AIClient:
+    """Optimization requests against a backend, run on a private event loop thread.
+
+    Responses are cached (LRU) by code hash and energy bucket; identical
+    requests arriving while one is in flight share its result. Each attempt
+    is bounded by `timeout` and failures are retried `retries` times with
+    jittered exponential backoff. All cache state lives on the loop thread.
+    """
+
+    def __init__(self, backend, timeout=DEFAULT_TIMEOUT, retries=DEFAULT_RETRIES, backoff=DEFAULT_BACKOFF,
+                 cache_items=DEFAULT_CACHE_ITEMS):
+        self.backend = backend
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.cache_items = cache_items
+        self._cache = OrderedDict()
+        self._inflight = {}
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name="ai-client", daemon=True)
+        self._thread.start()
+
+    def submit(self, code, joules, hotspots=None):
+        """Starts (or joins) a request; returns a Future of (optimized_code, content).
+
+        With a slicer.HotspotSlice as `hotspots`, only the slice is sent and
+        the rewritten functions are spliced back into `code`.
+        """
+        return asyncio.run_coroutine_threadsafe(self.optimize(code, joules, hotspots), self._loop)
+
+    def optimize_sync(self, code, joules, hotspots=None):
+        return self.submit(code, joules, hotspots).result()
+
+    async def optimize(self, code, joules, hotspots=None):
+        # The slice is part of the key: the same file sliced differently is a different prompt.
+        key = request_key(code + "\0" + hotspots.text if hotspots else code, joules)
+        if key in self._cache:
+            self._cache.move_to_end(key)
+            return self._cache[key]
+        task = self._inflight.get(key)
+        if task is None:
+            task = self._loop.create_task(self._generate(code, joules, hotspots))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        # shield: one caller giving up must not cancel the request for the others
+        result = await asyncio.shield(task)
+        if result[0] is not None:
+            self._cache[key] = result
+            while len(self._cache) > self.cache_items:
+                self._cache.popitem(last=False)
+        return result
+
+    async def _generate(self, code, joules, hotspots=None):
+        prompt = build_hotspot_prompt(hotspots.text, joules) if hotspots else build_prompt(code, joules)
+        for attempt in range(self.retries + 1):
+            try:
+                content = await asyncio.wait_for(self.backend.generate(prompt), self.timeout)
+                break
+            except Exception:
+                if attempt == self.retries:
+                    raise
+                await asyncio.sleep(self.backoff * 2 ** attempt * (1 + random.random() / 2))
+        optimized = extract_code(content)
+        if hotspots and optimized:
+            optimized = hotspots.splice(optimized)
+        return optimized, content
+
+    def clear(self):
+        self._loop.call_soon_threadsafe(self._cache.clear)
+
+    def close(self):
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
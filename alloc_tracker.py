@@ -0,0 +1,168 @@
+"""tracemalloc-based allocation tracking, attributed to the same (file, line, func) keys as the CPU stats."""
+import bisect, fnmatch, linecache, sysconfig, threading, time, tracemalloc
+from line_tracer import iter_code_objects
+
+DEFAULT_INTERVAL = 0.1
+PEAK_STEP = 1.1  # re-snapshot once traced memory exceeds the last snapshot's level by 10%
+DEFAULT_FRAMES = 8  # enough to see past threading, contextlib or glob into the code that called them
+_STDLIB = sysconfig.get_paths()["stdlib"]
+_SITE = (sysconfig.get_paths()["purelib"], sysconfig.get_paths()["platlib"])
+
+
+def is_stdlib(filename):
+    """True for the standard library, and for code it generates (namedtuple methods, frozen modules)."""
+    return (filename.startswith(("<frozen ", "<string>"))
+            or (filename.startswith(_STDLIB) and not filename.startswith(_SITE)))
+
+
+class LineToFunction:
+    """Maps (filename, lineno) to the key of the innermost function containing that line.
+
+    Files are compiled from their linecache source, so the keys match
+    cProfile's (co_filename, co_firstlineno, co_name) exactly; files without
+    source fall back to the nearest preceding function among the stats keys.
+    """
+
+    def __init__(self, stats=None):
+        self._files = {}
+        self._known = {}
+        for key in sorted(stats or ()):
+            lines, keys = self._known.setdefault(key[0], ([], []))
+            lines.append(key[1])
+            keys.append(key)
+
+    def _index(self, filename):
+        if filename not in self._files:
+            lines = {}
+            source = "".join(linecache.getlines(filename))
+            try:
+                code = compile(source, filename, "exec") if source else None
+            except (SyntaxError, ValueError):
+                code = None
+            if code is not None:
+                for obj in iter_code_objects(code):  # outer first, so nested code overwrites its lines
+                    key = (filename, obj.co_firstlineno, obj.co_name)
+                    for _, _, line in obj.co_lines():
+                        if line is not None:
+                            lines[line] = key
+            self._files[filename] = lines
+        return self._files[filename]
+
+    def __call__(self, filename, lineno):
+        key = self._index(filename).get(lineno)
+        if key is not None:
+            return key
+        if filename in self._known:
+            lines, keys = self._known[filename]
+            i = bisect.bisect_right(lines, lineno) - 1
+            if i >= 0:
+                return keys[i]
+        return (filename, lineno, f"<line {lineno}>")
+
+
+class AllocationTracker:
+    """Traces Python allocations during a run.
+
+    A background thread samples the traced total every `interval` seconds
+    (the memory-over-time curve the DRAM estimate integrates) and takes a
+    snapshot each time memory reaches a new high, so the last one shows who
+    held memory at the peak. A final snapshot shows what was still held at
+    the end. tracemalloc slows allocation-heavy code, and that overhead is
+    included in the run's CPU time. `ignore` lists filename patterns (the
+    profiler's own modules) whose allocations are left out, including those
+    they make through the standard library, such as starting their helper
+    threads: each allocation keeps `frames` frames, and one whose nearest
+    frame outside the standard library is an ignored file is dropped.
+    """
+
+    def __init__(self, interval=DEFAULT_INTERVAL, frames=DEFAULT_FRAMES, ignore=()):
+        self.interval = interval
+        self.frames = frames
+        self.ignore = (tracemalloc.__file__, __file__, *ignore)
+        self.filters = [tracemalloc.Filter(False, pattern) for pattern in self.ignore]
+        self.t = []
+        self.current = []
+        self._peak_snapshot = None
+        self._peak_level = 0
+        self._final_snapshot = None
+        self._peak = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        tracemalloc.start(self.frames)
+        self._t0 = time.perf_counter()
+        self._sample()
+        self._thread = threading.Thread(target=self._run, name="alloc-tracker", daemon=True)
+        self._thread.start()
+
+    def _sample(self):
+        current, _ = tracemalloc.get_traced_memory()
+        self.t.append(time.perf_counter() - self._t0)
+        self.current.append(current)
+        if current > self._peak_level * PEAK_STEP:
+            self._peak_snapshot = tracemalloc.take_snapshot()
+            self._peak_level = current
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self._sample()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        self._sample()
+        self._final_snapshot = tracemalloc.take_snapshot()
+        _, self._peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def byte_seconds(self):
+        """Traced memory integrated over the run (trapezoids between samples)."""
+        total = 0.0
+        for i in range(1, len(self.t)):
+            total += (self.current[i] + self.current[i - 1]) / 2 * (self.t[i] - self.t[i - 1])
+        return total
+
+    def _ignored(self, traceback):
+        for frame in reversed(traceback):  # most recent first
+            if any(fnmatch.fnmatch(frame.filename, pattern) for pattern in self.ignore):
+                return True
+            if not is_stdlib(frame.filename):
+                return False
+        # only the standard library: ignored if that is the whole stack (e.g. a helper thread's bootstrap)
+        return len(traceback) < self.frames
+
+    def _by_key(self, snapshot, to_key):
+        totals = {}
+        if snapshot is None:
+            return totals
+        snapshot = snapshot.filter_traces(self.filters)
+        for stat in snapshot.statistics("traceback"):
+            if self._ignored(stat.traceback):
+                continue
+            frame = stat.traceback[-1]
+            key = to_key(frame.filename, frame.lineno)
+            size, count = totals.get(key, (0, 0))
+            totals[key] = (size + stat.size, count + stat.count)
+        return totals
+
+    def result(self, stats=None):
+        """{"peak", "byte_seconds", "t", "current", "functions"}, marshal-friendly.
+
+        `functions` maps each key to (bytes held at the peak, blocks held at
+        the peak, bytes still held at the end).
+        """
+        to_key = LineToFunction(stats)
+        at_peak = self._by_key(self._peak_snapshot, to_key)
+        at_end = self._by_key(self._final_snapshot, to_key)
+        functions = {key: (at_peak.get(key, (0, 0))[0], at_peak.get(key, (0, 0))[1], at_end.get(key, (0, 0))[0])
+                     for key in at_peak.keys() | at_end.keys()}
+        return {"peak": self._peak, "byte_seconds": self.byte_seconds(), "t": self.t,
+                "current": self.current, "functions": functions}
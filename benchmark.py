@@ -0,0 +1,102 @@
+"""Repeated-run benchmarking: warmup, median/p95 energy and bootstrap confidence intervals."""
+import marshal, os, random, statistics
+from energy import run_energy
+from profiler import profile_job
+
+DEFAULT_RUNS = 10
+DEFAULT_WARMUP = 2
+DEFAULT_RESAMPLES = 2000
+DEFAULT_CONFIDENCE = 0.95
+
+
+def percentile(values, q):
+    """The q-th percentile (0-100) with linear interpolation between closest ranks."""
+    ordered = sorted(values)
+    if not ordered:
+        raise ValueError("percentile of empty data")
+    pos = (len(ordered) - 1) * q / 100
+    lo = int(pos)
+    hi = min(lo + 1, len(ordered) - 1)
+    return ordered[lo] + (ordered[hi] - ordered[lo]) * (pos - lo)
+
+
+def bootstrap_ci(values, stat=statistics.median, resamples=DEFAULT_RESAMPLES,
+                 confidence=DEFAULT_CONFIDENCE, seed=0):
+    """Percentile-bootstrap confidence interval for `stat` over `values`."""
+    rng = random.Random(seed)
+    n = len(values)
+    estimates = [stat(rng.choices(values, k=n)) for _ in range(resamples)]
+    tail = (1 - confidence) / 2 * 100
+    return percentile(estimates, tail), percentile(estimates, 100 - tail)
+
+
+def summarize(values, confidence=DEFAULT_CONFIDENCE):
+    low, high = bootstrap_ci(values, confidence=confidence)
+    return {
+        "n": len(values),
+        "median": statistics.median(values),
+        "p95": percentile(values, 95),
+        "ci_low": low,
+        "ci_high": high,
+        "stdev": statistics.stdev(values) if len(values) > 1 else 0.0,
+    }
+
+
+def compare(before, after, resamples=DEFAULT_RESAMPLES, confidence=DEFAULT_CONFIDENCE, seed=0):
+    """Bootstraps the change in median from `before` to `after`.
+
+    The difference is significant when its confidence interval excludes zero.
+    A negative delta means `after` used less energy.
+    """
+    rng = random.Random(seed)
+    deltas = [statistics.median(rng.choices(after, k=len(after)))
+              - statistics.median(rng.choices(before, k=len(before)))
+              for _ in range(resamples)]
+    tail = (1 - confidence) / 2 * 100
+    low, high = percentile(deltas, tail), percentile(deltas, 100 - tail)
+    base = statistics.median(before)
+    delta = statistics.median(after) - base
+    return {
+        "delta": delta,
+        "pct": delta / base * 100 if base else 0.0,
+        "ci_low": low,
+        "ci_high": high,
+        "significant": low > 0 or high < 0,
+    }
+
+
+def benchmark_job(file_path, settings=None, source=None):
+    """Worker entry point: `warmup` discarded runs, then `runs` measured ones, in one process.
+
+    `source`, if given, is the script's text, profiled in memory as in `profile_job`.
+
+    Returns the last run's marshalled report with a `benchmark` entry holding
+    the per-run energies and wall times.
+    """
+    settings = settings or {}
+    runs = settings.get("benchmark_runs", DEFAULT_RUNS)
+    warmup = settings.get("benchmark_warmup", DEFAULT_WARMUP)
+    reports = []
+    for i in range(warmup + runs):
+        report = marshal.loads(profile_job(file_path, settings, source=source))
+        if i >= warmup:
+            reports.append(report)
+
+    last = reports[-1]
+    last["benchmark"] = {
+        "runs": runs,
+        "warmup": warmup,
+        "energies": [run_energy(r) for r in reports],
+        "wall_times": [r["wall_time"] for r in reports],
+    }
+    return marshal.dumps(last)
+
+
+def run_benchmark_in_pool(pool, file_path, settings, source=None):
+    """Runs a whole benchmark as one pool job, with time limits scaled to the number of runs."""
+    total = settings.get("benchmark_runs", DEFAULT_RUNS) + settings.get("benchmark_warmup", DEFAULT_WARMUP)
+    if source is None:
+        file_path = os.path.abspath(file_path)
+    return marshal.loads(pool.run(benchmark_job, (file_path, settings), {"source": source},
+                                  wall_timeout=pool.wall_timeout * total,
+                                  cpu_timeout=pool.cpu_timeout * total))
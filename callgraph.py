@@ -0,0 +1,110 @@
+"""Call-graph view of pstats-style stats: exclusive/inclusive energy, top-N and icicle data."""
+import heapq, os
+from energy import CPU_POWER_WATTS, estimate_energy
+
+DEFAULT_TOP_N = 10
+DEFAULT_MAX_DEPTH = 12
+DEFAULT_MIN_FRACTION = 0.002  # icicle nodes below this share of the total are dropped
+DEFAULT_MAX_NODES = 3000
+
+
+def format_key(key):
+    """Readable label for a (file, line, func) key; built-ins ('~', 0, name) keep just the name."""
+    filename, line, func = key
+    if filename == "~":
+        return func
+    return f"{func} ({os.path.basename(filename)}:{line})"
+
+
+class CallGraph:
+    """Functions as nodes, pstats `callers` entries as weighted edges.
+
+    Each stats value is (primitive calls, calls, self time, inclusive time,
+    callers), where callers maps caller key -> the same tuple restricted to
+    calls made from that caller. Self times partition the run, so their sum is
+    the total without double counting nested calls.
+    """
+
+    def __init__(self, stats):
+        self.stats = stats
+        self.total_time = sum(data[2] for data in stats.values())
+        self._children = None
+
+    def exclusive_energy(self, key, watts=CPU_POWER_WATTS):
+        return estimate_energy(self.stats[key][2], watts)
+
+    def inclusive_energy(self, key, watts=CPU_POWER_WATTS):
+        return estimate_energy(self.stats[key][3], watts)
+
+    def total_energy(self, watts=CPU_POWER_WATTS):
+        return estimate_energy(self.total_time, watts)
+
+    def top(self, n=DEFAULT_TOP_N, inclusive=False):
+        """The n most expensive functions as (key, seconds), via a heap rather than a full sort."""
+        field = 3 if inclusive else 2
+        return [(key, data[field]) for key, data in
+                heapq.nlargest(n, self.stats.items(), key=lambda kv: kv[1][field])]
+
+    def children(self):
+        """caller key -> [(callee key, inclusive seconds spent in callee when called from caller)]."""
+        if self._children is None:
+            children = {}
+            for callee, data in self.stats.items():
+                for caller, edge in data[4].items():
+                    children.setdefault(caller, []).append((callee, edge[3]))
+            self._children = children
+        return self._children
+
+    def roots(self):
+        """Functions with no recorded caller inside the profile."""
+        return [key for key, data in self.stats.items()
+                if not any(caller in self.stats for caller in data[4])]
+
+    def icicle(self, watts=CPU_POWER_WATTS, max_depth=DEFAULT_MAX_DEPTH,
+               min_fraction=DEFAULT_MIN_FRACTION, max_nodes=DEFAULT_MAX_NODES):
+        """Flame/icicle chart data: parallel lists of ids, labels, parents and values (joules).
+
+        pstats only records caller->callee edges, not whole stacks, so a
+        function reached along several paths has its edge time split between
+        them in proportion to the time its parent has on each path. Children
+        are clamped so they never exceed their parent, recursion is cut at the
+        first repeat on a path, and tiny branches are pruned.
+        """
+        children = self.children()
+        total = sum(self.stats[r][3] for r in self.roots()) or self.total_time
+        floor = total * min_fraction
+        out = {"ids": [], "labels": [], "parents": [], "values": []}
+
+        def add(node_id, key, parent_id, seconds):
+            out["ids"].append(node_id)
+            out["labels"].append(format_key(key))
+            out["parents"].append(parent_id)
+            out["values"].append(estimate_energy(seconds, watts))
+
+        # Explicit stack instead of recursion: deep call chains must not hit the recursion limit.
+        stack = []
+        for root in sorted(self.roots(), key=lambda k: -self.stats[k][3]):
+            seconds = self.stats[root][3]
+            if seconds >= floor:
+                node_id = str(len(out["ids"]))
+                add(node_id, root, "", seconds)
+                stack.append((root, node_id, seconds, 1, frozenset([root])))
+
+        while stack and len(out["ids"]) < max_nodes:
+            key, node_id, seconds, depth, path = stack.pop()
+            if depth >= max_depth:
+                continue
+            own_total = self.stats[key][3]
+            share = seconds / own_total if own_total > 0 else 0.0
+            kids = [(callee, edge_ct * share) for callee, edge_ct in children.get(key, ())
+                    if callee not in path]
+            kid_total = sum(ct for _, ct in kids)
+            if kid_total > seconds > 0:
+                kids = [(callee, ct * seconds / kid_total) for callee, ct in kids]
+            for callee, ct in kids:
+                if ct < floor or len(out["ids"]) >= max_nodes:
+                    continue
+                child_id = str(len(out["ids"]))
+                add(child_id, callee, node_id, ct)
+                stack.append((callee, child_id, ct, depth + 1, path | {callee}))
+        return out
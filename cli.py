@@ -0,0 +1,116 @@
+"""Headless batch profiling: every script under a directory or glob, one JSON line per script.
+
+    python cli.py jobs/ --recursive > nightly.jsonl
+    python cli.py "etl/*.py" --workers 8 --top 0
+"""
+import argparse, glob, json, marshal, os, sys
+from concurrent.futures import as_completed
+from callgraph import CallGraph, format_key
+from energy import calculate_grade, estimate_energy, run_energy, IDLE_POWER_WATTS
+from power_model import load_profiles
+from profiler import profile_job
+from worker_pool import ProfilerPool, DEFAULT_WALL_TIMEOUT, DEFAULT_CPU_TIMEOUT
+
+
+def find_scripts(targets, recursive=False):
+    """Expands directories and glob patterns into a sorted, de-duplicated list of .py files."""
+    found = set()
+    for target in targets:
+        if os.path.isdir(target):
+            pattern = os.path.join(target, "**", "*.py") if recursive else os.path.join(target, "*.py")
+            found.update(glob.glob(pattern, recursive=recursive))
+        elif any(ch in target for ch in "*?["):
+            found.update(p for p in glob.glob(target, recursive=True) if p.endswith(".py"))
+        elif os.path.isfile(target):
+            found.add(target)
+    return sorted(os.path.abspath(p) for p in found)
+
+
+def build_record(script, report, top=10):
+    """The dashboard's headline numbers for one script: grade, total joules, per-function energy."""
+    watts = report["energy"]["watts"]
+    stats = report["stats"]
+    graph = CallGraph(stats)
+    total = run_energy(report)
+    ranked = graph.top(top if top > 0 else len(stats))
+    return {
+        "script": script,
+        "grade": calculate_grade(total)[0],
+        "total_joules": total,
+        "wall_time": report["wall_time"],
+        "cpu_time": report["cpu_time"],
+        "idle_joules": report["energy"].get("idle_joules", 0.0),
+        "energy_source": report["energy"]["source"],
+        "watts": watts,
+        "functions": [
+            {
+                "function": format_key(key),
+                "file": key[0],
+                "line": key[1],
+                "name": key[2],
+                "calls": stats[key][1],
+                "self_joules": estimate_energy(self_time, watts),
+                "inclusive_joules": estimate_energy(stats[key][3], watts),
+            }
+            for key, self_time in ranked
+        ],
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Profile many Python scripts in parallel and emit JSON lines.")
+    parser.add_argument("targets", nargs="+", help="script files, directories or glob patterns")
+    parser.add_argument("-r", "--recursive", action="store_true", help="descend into subdirectories")
+    parser.add_argument("-w", "--workers", type=int, default=None, help="worker processes (default: all cores)")
+    parser.add_argument("--profiler", choices=["cprofile", "sampling"], default="cprofile")
+    parser.add_argument("--machine", choices=sorted(load_profiles()[1]), default=None,
+                        help="power model profile where RAPL is unavailable (default: configured default)")
+    parser.add_argument("--clock", choices=["cpu", "wall"], default="cpu",
+                        help="time functions in CPU seconds (waiting charged at a per-process baseline) or wall seconds")
+    parser.add_argument("--idle-watts", type=float, default=None,
+                        help=f"power charged while a script waits (default: {IDLE_POWER_WATTS} W per process)")
+    parser.add_argument("--timeout", type=float, default=DEFAULT_WALL_TIMEOUT, help="wall-clock seconds per script")
+    parser.add_argument("--cpu-timeout", type=float, default=DEFAULT_CPU_TIMEOUT, help="CPU seconds per script")
+    parser.add_argument("--top", type=int, default=10, help="functions per record, 0 for all")
+    parser.add_argument("-o", "--output", default="-", help="output file (default: stdout)")
+    args = parser.parse_args(argv)
+
+    scripts = find_scripts(args.targets, args.recursive)
+    if not scripts:
+        parser.error("no Python scripts found")
+
+    out = sys.stdout if args.output == "-" else open(args.output, "w")
+    pool = ProfilerPool(workers=args.workers, wall_timeout=args.timeout, cpu_timeout=args.cpu_timeout)
+    # Captured so the scripts' own prints can't corrupt the JSON lines on stdout.
+    settings = {"profiler": args.profiler, "clock": args.clock, "capture_output": True}
+    if args.idle_watts is not None:
+        settings["idle_watts"] = args.idle_watts
+    if args.machine:
+        settings["machine"] = args.machine
+    failures = 0
+    try:
+        futures = {pool.submit(profile_job, (script, settings)): script for script in scripts}
+        for future in as_completed(futures):
+            script = futures[future]
+            try:
+                report = marshal.loads(future.result())
+                error = report["outcome"]["error"]
+            except Exception as e:
+                lines = str(e).strip().splitlines()
+                error = f"{type(e).__name__}: {lines[-1] if lines else ''}"
+            if error:
+                failures += 1
+                record = {"script": script, "error": error}
+            else:
+                record = build_record(script, report, args.top)
+            out.write(json.dumps(record) + "\n")
+            out.flush()
+    finally:
+        pool.shutdown()
+        if out is not sys.stdout:
+            out.close()
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,94 @@
+"""AST-level comparison of two versions of a script, for re-profiling in the live editor.
+
+Comparing syntax trees rather than text means edits to comments, blank
+lines and formatting are recognised as no-ops, whose measurements can be
+reused, and real edits can be narrowed down to the functions whose bodies
+changed. A real edit still re-runs the whole script.
+"""
+import ast
+from line_tracer import iter_code_objects
+
+
+def parse(source):
+    """The module's AST, or None if it doesn't parse."""
+    try:
+        return ast.parse(source)
+    except SyntaxError:
+        return None
+
+
+def syntax_error(source):
+    """A one-line description of the first syntax error, or None."""
+    try:
+        ast.parse(source)
+    except SyntaxError as e:
+        return f"line {e.lineno}: {e.msg}"
+    return None
+
+
+def same_program(old_source, new_source):
+    """True if the two sources differ only in comments, blank lines and formatting."""
+    old, new = parse(old_source), parse(new_source)
+    # ast.dump leaves out line and column attributes by default
+    return old is not None and new is not None and ast.dump(old) == ast.dump(new)
+
+
+def function_bodies(tree):
+    """{qualified name: dump of the def} for every function and method, nested ones included."""
+    bodies = {}
+
+    def visit(node, prefix):
+        for child in ast.iter_child_nodes(node):
+            if isinstance(child, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+                name = f"{prefix}{child.name}"
+                if not isinstance(child, ast.ClassDef):
+                    bodies[name] = ast.dump(child)
+                visit(child, name + ".")
+            else:
+                visit(child, prefix)
+
+    visit(tree, "")
+    return bodies
+
+
+def diff_functions(old_source, new_source):
+    """Which functions were changed, added or removed, and which kept an identical body.
+
+    Returns a dict of sorted name lists: "changed", "added", "removed" and
+    "unchanged", plus "module" (True if module-level code outside the
+    functions changed). None if either version doesn't parse.
+    """
+    old, new = parse(old_source), parse(new_source)
+    if old is None or new is None:
+        return None
+    before, after = function_bodies(old), function_bodies(new)
+
+    def top_level(tree):
+        return [ast.dump(node) for node in tree.body
+                if not isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef))]
+
+    return {
+        "changed": sorted(name for name in before.keys() & after.keys() if before[name] != after[name]),
+        "added": sorted(after.keys() - before.keys()),
+        "removed": sorted(before.keys() - after.keys()),
+        "unchanged": sorted(name for name in before.keys() & after.keys() if before[name] == after[name]),
+        "module": top_level(old) != top_level(new),
+    }
+
+
+def remap_stats(stats, filename, old_source, new_source):
+    """Stats measured on `old_source`, with the script's keys moved to their line numbers in `new_source`.
+
+    Only valid when `same_program` holds: both versions then compile to the
+    same tree of code objects, which are paired up in order.
+    """
+    old_code = compile(old_source, filename, "exec")
+    new_code = compile(new_source, filename, "exec")
+    moved = {}
+    for before, after in zip(iter_code_objects(old_code), iter_code_objects(new_code)):
+        moved[(filename, before.co_firstlineno, before.co_name)] = (filename, after.co_firstlineno, after.co_name)
+
+    def key(k):
+        return moved.get(k, k)
+
+    return {key(k): data[:4] + ({key(c): edge for c, edge in data[4].items()},) for k, data in stats.items()}
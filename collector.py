@@ -0,0 +1,225 @@
+"""Receives the production agents' deltas and keeps running per-service totals for the dashboard.
+
+    python collector.py                                 # ENERGY_PROFILER_COLLECTOR, or 127.0.0.1:8765
+    python collector.py --listen unix:/run/energy-agent.sock
+
+Every connection carries JSON lines. {"type": "delta", ...} lines from
+agents (agent.py) are merged into their service's totals, whichever
+process sent them; a {"type": "snapshot"} line is answered with one JSON
+line of every service's totals, which is how the dashboard reads the
+collector (`fetch_snapshot`). Totals live in memory, since the collector
+started.
+"""
+import argparse, json, os, socket, socketserver, sys, threading, time
+from collections import deque
+from agent import DEFAULT_ADDRESS, connect, decode_stats, encode_stats, parse_address
+from energy import CPU_POWER_WATTS
+from prof_ingest import merge_into
+
+MAX_MESSAGE_BYTES = 64 * 2**20
+BUCKET_SECONDS = 60
+MAX_BUCKETS = 24 * 60   # a day of per-minute CPU totals per service
+ACTIVE_SECONDS = 60     # a process that hasn't reported for this long no longer counts as active, and is dropped
+
+
+class ServiceTotals:
+    """Everything the agents of one service have reported: merged stats, CPU time, and their processes."""
+
+    def __init__(self, now):
+        self.stats = {}
+        self.processes = {}
+        self.cpu = self.agent = 0.0
+        self.samples = self.dropped = 0
+        self.clock = None
+        self.first_seen = self.last_seen = now
+        self.buckets = deque(maxlen=MAX_BUCKETS)
+
+    def add(self, message, stats, now):
+        merge_into(self.stats, stats)
+        self.cpu += message["cpu"]
+        self.agent += message["agent"]
+        self.samples += message["samples"]
+        self.dropped += message["dropped"]
+        self.clock = message["clock"]
+        self.last_seen = now
+        start = now - now % BUCKET_SECONDS
+        if self.buckets and self.buckets[-1][0] == start:
+            self.buckets[-1][1] += message["cpu"]
+        else:
+            self.buckets.append([start, message["cpu"]])
+        process = self.processes.setdefault(f"{message['host']}:{message['pid']}", {
+            "host": message["host"], "pid": message["pid"], "cpu": 0.0, "agent": 0.0})
+        process["cpu"] += message["cpu"]
+        process["agent"] += message["agent"]
+        process["last_seen"] = now
+        # restarted workers come back under new pids; forget the ones that have gone quiet
+        for name in [name for name, p in self.processes.items() if now - p["last_seen"] >= ACTIVE_SECONDS]:
+            del self.processes[name]
+
+    def summary(self, now, functions=False):
+        summary = {
+            "first_seen": self.first_seen, "last_seen": self.last_seen, "cpu_seconds": self.cpu,
+            "agent_seconds": self.agent, "samples": self.samples, "dropped": self.dropped, "clock": self.clock,
+            "active": sum(1 for p in self.processes.values() if now - p["last_seen"] < ACTIVE_SECONDS),
+            "processes": list(self.processes.values()), "series": list(self.buckets),
+        }
+        if functions:
+            summary["functions"] = encode_stats(self.stats)
+        return summary
+
+
+class Collector:
+    """Listens for agents and dashboard readers on `address` from a background thread."""
+
+    def __init__(self, address=DEFAULT_ADDRESS):
+        self.address = address
+        self.services = {}
+        self._lock = threading.Lock()
+        self._server = None
+        self._thread = None
+
+    def start(self):
+        family, target = parse_address(self.address)
+        if family == socket.AF_UNIX:
+            _remove_stale_socket(self.address, target)
+            server_class = _UnixServer
+        else:
+            server_class = _TCP6Server if family == socket.AF_INET6 else _TCPServer
+        self._server = server_class(target, _Handler)
+        self._server.collector = self
+        self._thread = threading.Thread(target=self._server.serve_forever, name="collector", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            family, target = parse_address(self.address)
+            if family == socket.AF_UNIX and os.path.exists(target):
+                os.unlink(target)
+            self._server = None
+
+    def handle(self, message):
+        """The reply to one message from a connection, or None."""
+        if message["type"] == "delta":
+            self.add(message)
+            return None
+        if message["type"] == "snapshot":
+            return self.snapshot(message.get("service"))
+        raise ValueError(f"unknown message type {message['type']!r}")
+
+    def add(self, message):
+        """Merges one agent delta into its service's totals."""
+        stats = decode_stats(message["functions"])
+        for field in ("cpu", "agent", "samples", "dropped"):
+            if not isinstance(message[field], (int, float)):
+                raise ValueError(f"{field} must be a number")
+        service = str(message["service"])
+        now = time.time()
+        with self._lock:
+            if service not in self.services:
+                self.services[service] = ServiceTotals(now)
+            self.services[service].add(message, stats, now)
+
+    def snapshot(self, service=None):
+        """{"time", "services": {name: summary}}; only `service`'s summary includes its functions."""
+        now = time.time()
+        with self._lock:
+            return {"time": now, "services": {name: totals.summary(now, functions=name == service)
+                                              for name, totals in self.services.items()}}
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    def handle(self):
+        collector = self.server.collector
+        while True:
+            line = self.rfile.readline(MAX_MESSAGE_BYTES + 1)
+            if not line.endswith(b"\n"):
+                return  # closed, or a message over the size limit
+            try:
+                reply = collector.handle(json.loads(line))
+            except (ValueError, TypeError, KeyError):
+                return  # not something an agent or the dashboard sent; drop the connection
+            if reply is not None:
+                self.wfile.write(json.dumps(reply, separators=(",", ":")).encode("utf-8") + b"\n")
+
+
+class _TCPServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+class _TCP6Server(_TCPServer):
+    address_family = socket.AF_INET6
+
+
+class _UnixServer(socketserver.ThreadingUnixStreamServer):
+    daemon_threads = True
+
+
+def _remove_stale_socket(address, path):
+    # A socket file left by a collector that died; a live one still accepts connections.
+    if not os.path.exists(path):
+        return
+    try:
+        connect(address).close()
+    except OSError:
+        os.unlink(path)
+    else:
+        raise OSError(f"a collector is already listening on {address}")
+
+
+def fetch_snapshot(address=DEFAULT_ADDRESS, service=None, timeout=5.0):
+    """A running collector's snapshot; OSError if none is listening on `address`."""
+    with connect(address, timeout) as sock:
+        sock.sendall(json.dumps({"type": "snapshot", "service": service}).encode("utf-8") + b"\n")
+        with sock.makefile("rb") as f:
+            line = f.readline(MAX_MESSAGE_BYTES + 1)
+    if not line.endswith(b"\n"):
+        raise OSError(f"incomplete reply from the collector on {address}")
+    return json.loads(line)
+
+
+def service_report(snapshot, service, watts=CPU_POWER_WATTS):
+    """A report for one service's totals, with the keys `profiler.profile_job` reports carry.
+
+    Energy charges the processes' CPU time at the flat `watts` model; the
+    function stats hold the CPU seconds the agents' samples attribute.
+    """
+    summary = snapshot["services"][service]
+    return {
+        "script": service,
+        "stats": decode_stats(summary.get("functions", [])),
+        "wall_time": summary["last_seen"] - summary["first_seen"],
+        "cpu_time": summary["cpu_seconds"],
+        "energy": {"source": "agent", "domains": {}, "joules": summary["cpu_seconds"] * watts, "watts": watts,
+                   "idle_joules": 0.0, "idle_watts": 0.0, "clock": summary["clock"]},
+        "timeline": None,
+        "lines": None,
+        "memory": None,
+        "breakdown": None,
+        "outcome": None,
+        "production": {key: value for key, value in summary.items() if key != "functions"},
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Collect production agents' samples for the dashboard.")
+    parser.add_argument("--listen", default=DEFAULT_ADDRESS,
+                        help="unix:/path or host:port (default: ENERGY_PROFILER_COLLECTOR or 127.0.0.1:8765)")
+    args = parser.parse_args(argv)
+    collector = Collector(args.listen).start()
+    print(f"collecting on {args.listen}", file=sys.stderr)
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        collector.stop()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
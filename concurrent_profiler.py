@@ -0,0 +1,219 @@
+"""Profiles the threads and multiprocessing children a script starts, alongside the main thread.
+
+cProfile only hooks the thread that enables it. While a ConcurrentProfiler
+is active, every new threading.Thread gets its own cProfile.Profile through
+threading.setprofile, and every multiprocessing.Process (which includes
+concurrent.futures process pools) profiles its run() and dumps the stats
+to a temporary directory before exiting. `merge` folds everything into one
+pstats-style dict and keeps a per-thread/per-process breakdown. Every
+profiler uses the same `timer` as the main thread's, so a CPU-time clock
+(time.thread_time) charges each thread only for its own CPU time.
+
+Child processes are covered when they are forked, the Linux default before
+Python 3.14; spawned and forkserver children start from a fresh
+interpreter and are not profiled, so they are listed in the breakdown as
+"unprofiled process" with no time. From Python 3.12 cProfile can only be
+active once per process, so each thread is sampled by a StackSampler
+instead ("sampled thread"); samples count elapsed time, so such a thread's
+busy time includes its waiting whatever the clock.
+"""
+import cProfile, contextlib, glob, linecache, marshal, multiprocessing, os, pstats, shutil, signal, sys, tempfile, \
+    threading, time
+from multiprocessing import process as mp_process
+from sampling_profiler import StackSampler
+
+PER_THREAD_PROFILES = sys.version_info < (3, 12)
+
+
+def _exit_on_sigterm(signum, frame):
+    # multiprocessing.Pool terminates its workers; exit through the finally that saves the stats.
+    raise SystemExit(0)
+
+
+def _safe(name):
+    return name.replace(os.sep, "_")
+
+
+def _start_method(process):
+    return getattr(process, "_start_method", None) or multiprocessing.get_start_method()
+
+
+@contextlib.contextmanager
+def spawnable_main():
+    """Lets spawn and forkserver children of a script compiled in memory find their `__main__`.
+
+    Such children re-run `__main__` from its `__file__`, which for text
+    compiled under a synthetic name (see profiler.compile_script) names no
+    file. When the first one starts, the text is written from linecache to a
+    directory only this user can read, and `__main__.__file__` points there
+    while the child is prepared; the child then sees that path as its
+    `__file__`. Runs that start no such child never touch the disk.
+    """
+    original_start = mp_process.BaseProcess.start
+    directory = []
+
+    def start(process):
+        main = sys.modules.get("__main__")
+        name = getattr(main, "__file__", None)
+        if (_start_method(process) == "fork" or not name or name not in linecache.cache
+                or os.path.exists(name)):
+            return original_start(process)
+        if not directory:
+            directory.append(tempfile.mkdtemp(prefix="energy-profiler-"))
+        path = os.path.join(directory[0], os.path.basename(name))
+        if not os.path.exists(path):
+            with open(path, "w") as f:
+                f.writelines(linecache.cache[name][2])
+        main.__file__ = path
+        try:
+            original_start(process)
+        finally:
+            main.__file__ = name
+
+    mp_process.BaseProcess.start = start
+    try:
+        yield
+    finally:
+        mp_process.BaseProcess.start = original_start
+        if directory:
+            shutil.rmtree(directory[0], ignore_errors=True)
+
+
+def _dump(unit, path):
+    if isinstance(unit, StackSampler):
+        with open(path, "wb") as f:
+            marshal.dump(unit.stop().stats(), f)
+    else:
+        unit.dump_stats(path)
+
+
+def _summary(label, kind, stats):
+    busy = sum(data[2] for data in stats.values())
+    top = max(stats, key=lambda key: stats[key][2]) if stats else None
+    return {"label": label, "kind": kind, "seconds": busy,
+            "calls": sum(data[1] for data in stats.values()), "top": top}
+
+
+class ConcurrentProfiler:
+    """Context manager around a script run; see the module docstring."""
+
+    def __init__(self, timer=time.perf_counter):
+        self.timer = timer
+        self.breakdown = []
+        self._threads = []
+        self._unprofiled = []
+        self._lock = threading.Lock()
+        self._workdir = None
+        self._original_run = None
+        self._original_start = None
+
+    def __enter__(self):
+        self._workdir = None  # made when the first child starts; a run without children stays off the disk
+        threading.setprofile(self._start_thread_profile)
+        self._original_run = mp_process.BaseProcess.run
+        self._original_start = mp_process.BaseProcess.start
+        mp_process.BaseProcess.run = self._profiled_run()
+        mp_process.BaseProcess.start = self._noting_start()
+        return self
+
+    def __exit__(self, *exc):
+        threading.setprofile(None)
+        mp_process.BaseProcess.run = self._original_run
+        mp_process.BaseProcess.start = self._original_start
+        # in reverse, so each sampler puts back the switch interval the one before it found
+        for owner, _, unit in reversed(self._threads):
+            if owner == os.getpid() and isinstance(unit, StackSampler):
+                unit.stop()
+
+    def _start_thread_profile(self, frame, event, arg):
+        # Called on the first profile event of each new thread; enabling a
+        # Profile here replaces this hook for the rest of the thread.
+        thread = threading.current_thread()
+        if PER_THREAD_PROFILES:
+            unit = cProfile.Profile(self.timer)
+        elif thread.name == "stack-sampler":
+            sys.setprofile(None)
+            return
+        else:
+            sys.setprofile(None)
+            unit = StackSampler(thread.ident)
+        with self._lock:
+            self._threads.append((os.getpid(), thread.name, unit))
+        if isinstance(unit, StackSampler):
+            unit.start()
+        else:
+            unit.enable()
+
+    def _noting_start(self):
+        original_start, unprofiled = self._original_start, self._unprofiled
+
+        def start(process):
+            method = _start_method(process)
+            if method == "fork" and self._workdir is None:
+                self._workdir = tempfile.mkdtemp(prefix="energy-children-")  # before the fork copies it
+            original_start(process)
+            if method != "fork":
+                unprofiled.append((process.pid, process.name, method))
+
+        return start
+
+    def _profiled_run(self):
+        original_run, threads, timer = self._original_run, self._threads, self.timer
+
+        def run(process):
+            if signal.getsignal(signal.SIGTERM) == signal.SIG_DFL:
+                signal.signal(signal.SIGTERM, _exit_on_sigterm)
+            workdir = self._workdir
+            profile = cProfile.Profile(timer)
+            profile.enable()
+            try:
+                original_run(process)
+            finally:
+                profile.disable()
+                pid = os.getpid()
+                profile.dump_stats(os.path.join(workdir, f"{pid}.process.{_safe(process.name)}.prof"))
+                for owner, name, unit in list(threads):
+                    if owner == pid:  # threads this child started; the parent's were copied by fork
+                        kind = "sampled" if isinstance(unit, StackSampler) else "thread"
+                        _dump(unit, os.path.join(workdir, f"{pid}.{kind}.{_safe(name)}.prof"))
+
+        return run
+
+    def _units(self):
+        for owner, name, unit in self._threads:
+            if owner == os.getpid():
+                if isinstance(unit, StackSampler):
+                    yield f"thread {name}", "sampled thread", unit.stop().stats()
+                else:
+                    yield f"thread {name}", "thread", unit
+        paths = glob.glob(os.path.join(self._workdir, "*.prof")) if self._workdir else []
+        for path in sorted(paths):
+            pid, kind, name = os.path.basename(path)[:-len(".prof")].split(".", 2)
+            if kind == "process":
+                yield f"process {pid} ({name})", kind, path
+            else:
+                yield f"process {pid} thread {name}", "sampled thread" if kind == "sampled" else kind, path
+
+    def merge(self, main_stats):
+        """Main-thread stats plus every thread and child process; fills `breakdown`."""
+        self.breakdown = [_summary("main thread", "main", main_stats)]
+        merged = pstats.Stats()
+        merged.stats = dict(main_stats)
+        try:
+            for label, kind, source in self._units():
+                try:
+                    unit = pstats.Stats(source) if not isinstance(source, dict) else pstats.Stats()
+                except (TypeError, OSError, EOFError):
+                    continue  # a thread that never ran Python code, or a truncated dump
+                if isinstance(source, dict):
+                    unit.stats = source
+                if unit.stats:
+                    self.breakdown.append(_summary(label, kind, unit.stats))
+                    merged.add(unit)
+        finally:
+            if self._workdir:
+                shutil.rmtree(self._workdir, ignore_errors=True)
+        for pid, name, method in self._unprofiled:
+            self.breakdown.append({"label": f"process {pid} ({name}, {method})", "kind": "unprofiled process",
+                                   "seconds": 0.0, "calls": 0, "top": None})
+        return merged.stats
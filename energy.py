@@ -1,3 +1,61 @@
-CPU_POWER_WATTS = 30  # simple assumption
-def estimate_energy(cpu_time):
-    return cpu_time * CPU_POWER_WATTS
+import statistics
+
+CPU_POWER_WATTS = 30  # simple assumption, used when energy can't be measured
+def estimate_energy(cpu_time, watts=CPU_POWER_WATTS):
+    return cpu_time * watts
+
+DRAM_WATTS_PER_GB = 0.3725  # memory power per GB held, the figure the Green Algorithms model uses
+def dram_energy(byte_seconds, watts_per_gb=DRAM_WATTS_PER_GB):
+    """Joules for holding memory: GB-seconds times the per-GB power of DRAM."""
+    return byte_seconds / 2**30 * watts_per_gb
+
+IDLE_POWER_WATTS = 1  # charged per second a script waits on sleep, I/O or locks: one process's share of the machine's baseline
+def idle_energy(wall_time, busy_time, idle_watts=IDLE_POWER_WATTS):
+    """Joules for the part of the wall time the script spent off the CPU, at baseline power."""
+    return max(wall_time - busy_time, 0.0) * idle_watts
+
+def measured_watts(joules, seconds):
+    """Average power over a measured run; charged per profiled second in place of CPU_POWER_WATTS."""
+    if seconds <= 0 or joules <= 0:
+        return CPU_POWER_WATTS
+    return joules / seconds
+
+def process_share(joules, wall_time, cpu_time, host_cpu_time, baseline_watts, cpus):
+    """The part of a host-wide measurement that one process's CPU time accounts for.
+
+    Power above the machine's `baseline_watts` is split by CPU time: the
+    process gets its fraction of all busy CPU seconds on the host
+    (`host_cpu_time`), so concurrent jobs aren't billed for each other. The
+    baseline, which the machine draws whether or not the process runs, is
+    split by capacity: the process pays for the fraction of the `cpus` it
+    kept busy, and nothing for time it spent waiting.
+    """
+    baseline = min(baseline_watts * wall_time, max(joules, 0.0))
+    share = min(cpu_time / host_cpu_time, 1.0) if host_cpu_time > 0 else 1.0
+    capacity = min(cpu_time / (wall_time * cpus), 1.0) if wall_time > 0 and cpus else 0.0
+    return (max(joules, 0.0) - baseline) * share + baseline * capacity
+
+def run_energy(report):
+    """Total joules of one profiled run: functions' self time at the run's power, waiting, and DRAM.
+
+    A benchmarked report's total is the median of its runs'. The DRAM
+    estimate is left out when RAPL measured, since its dram domain already
+    counts memory. Every total that is shown, stored or compared comes from here.
+    """
+    if report.get("benchmark"):
+        return statistics.median(report["benchmark"]["energies"])
+    energy = report["energy"]
+    busy_time = sum(data[2] for data in report["stats"].values())
+    total = estimate_energy(busy_time, energy["watts"]) + energy.get("idle_joules", 0.0)
+    if report.get("memory") and energy["source"] != "rapl":
+        total += report["memory"]["dram_joules"]
+    return total
+
+def calculate_grade(total_energy):
+    """Calculates a sustainability grade (A-E) based on total energy consumption with botanical colors."""
+    if total_energy < 0.1: return "A+", "#059669"
+    if total_energy < 0.5: return "A", "#10b981"
+    if total_energy < 2.0: return "B", "#34d399"
+    if total_energy < 5.0: return "C", "#d97706" # Amber for contrast
+    if total_energy < 10.0: return "D", "#dc2626"
+    return "E", "#991b1b"
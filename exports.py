@@ -0,0 +1,102 @@
+"""Chunked exports of a ProfileFrame: properly quoted CSV, JSON lines, Parquet and Arrow IPC."""
+import csv, io
+
+try:
+    import pyarrow as pa
+    import pyarrow.ipc as pa_ipc
+    import pyarrow.parquet as pq
+except ImportError:  # optional: Parquet/Arrow exports are hidden without it
+    pa = None
+
+DEFAULT_CHUNK_ROWS = 50_000
+
+FORMATS = {
+    # name: (file extension, MIME type, needs pyarrow)
+    "CSV": ("csv", "text/csv", False),
+    "JSON Lines": ("jsonl", "application/x-ndjson", False),
+    "Parquet": ("parquet", "application/vnd.apache.parquet", True),
+    "Arrow IPC": ("arrow", "application/vnd.apache.arrow.file", True),
+}
+
+COLUMNS = ["file", "line", "name", "prim_calls", "calls", "self_time", "inclusive_time",
+           "self_energy", "inclusive_energy"]
+
+
+def available_formats():
+    return [name for name, (_, _, needs_arrow) in FORMATS.items() if pa is not None or not needs_arrow]
+
+
+def iter_chunks(frame, chunk_rows=DEFAULT_CHUNK_ROWS):
+    """Row slices of the frame's export columns, most expensive first."""
+    df = frame.df.sort_values("self_energy", ascending=False)[COLUMNS]
+    for start in range(0, len(df), chunk_rows):
+        yield df.iloc[start:start + chunk_rows]
+    if len(df) == 0:
+        yield df
+
+
+def write_csv(frame, out, chunk_rows=DEFAULT_CHUNK_ROWS):
+    """RFC 4180 CSV to a text stream; file names and function names are quoted as needed."""
+    writer = csv.writer(out)
+    writer.writerow(COLUMNS)
+    for chunk in iter_chunks(frame, chunk_rows):
+        writer.writerows(chunk.itertuples(index=False, name=None))
+
+
+def write_jsonl(frame, out, chunk_rows=DEFAULT_CHUNK_ROWS):
+    """One JSON object per function to a text stream."""
+    for chunk in iter_chunks(frame, chunk_rows):
+        if len(chunk):
+            text = chunk.to_json(orient="records", lines=True)
+            out.write(text if text.endswith("\n") else text + "\n")
+
+
+def _arrow_schema():
+    return pa.schema([
+        ("file", pa.dictionary(pa.int32(), pa.string())),
+        ("line", pa.int32()),
+        ("name", pa.dictionary(pa.int32(), pa.string())),
+        ("prim_calls", pa.int64()),
+        ("calls", pa.int64()),
+        ("self_time", pa.float64()),
+        ("inclusive_time", pa.float64()),
+        ("self_energy", pa.float64()),
+        ("inclusive_energy", pa.float64()),
+    ])
+
+
+def _record_batches(frame, chunk_rows):
+    schema = _arrow_schema()
+    for chunk in iter_chunks(frame, chunk_rows):
+        # Slices keep the frame's full categories, so every batch carries the same dictionary,
+        # which the IPC file format requires.
+        yield pa.RecordBatch.from_pandas(chunk, schema=schema, preserve_index=False)
+
+
+def write_parquet(frame, out, chunk_rows=DEFAULT_CHUNK_ROWS):
+    """Parquet to a binary stream, one row group per chunk."""
+    with pq.ParquetWriter(out, _arrow_schema(), compression="zstd") as writer:
+        for batch in _record_batches(frame, chunk_rows):
+            writer.write_batch(batch)
+
+
+def write_arrow(frame, out, chunk_rows=DEFAULT_CHUNK_ROWS):
+    """Arrow IPC file format to a binary stream, one record batch per chunk."""
+    with pa_ipc.new_file(out, _arrow_schema()) as writer:
+        for batch in _record_batches(frame, chunk_rows):
+            writer.write_batch(batch)
+
+
+def export_bytes(frame, fmt, chunk_rows=DEFAULT_CHUNK_ROWS):
+    """Serializes the frame in one of FORMATS; returns bytes ready for a download button."""
+    if fmt == "CSV" or fmt == "JSON Lines":
+        out = io.StringIO()
+        (write_csv if fmt == "CSV" else write_jsonl)(frame, out, chunk_rows)
+        return out.getvalue().encode("utf-8")
+    if fmt in FORMATS:
+        if pa is None:
+            raise RuntimeError(f"{fmt} export needs pyarrow")
+        out = io.BytesIO()
+        (write_parquet if fmt == "Parquet" else write_arrow)(frame, out, chunk_rows)
+        return out.getvalue()
+    raise ValueError(f"unknown export format: {fmt}")
@@ -0,0 +1,123 @@
+"""SQLite store of every profiling run, with indexed per-script and per-function trend queries."""
+import hashlib, json, os, sqlite3, time
+from contextlib import closing
+from energy import run_energy
+
+DEFAULT_DB_PATH = os.environ.get(
+    "ENERGY_PROFILER_HISTORY_DB",
+    os.path.join(os.path.expanduser("~"), ".local", "share", "energy-profiler", "history.sqlite3"),
+)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    script_name TEXT NOT NULL,
+    script_hash TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    settings TEXT NOT NULL,
+    total_energy REAL NOT NULL,
+    wall_time REAL,
+    watts REAL,
+    energy_source TEXT
+);
+CREATE INDEX IF NOT EXISTS runs_by_script ON runs (script_name, created_at);
+CREATE INDEX IF NOT EXISTS runs_by_hash ON runs (script_hash);
+
+CREATE TABLE IF NOT EXISTS functions (
+    run_id INTEGER NOT NULL REFERENCES runs (id) ON DELETE CASCADE,
+    func_key TEXT NOT NULL,
+    line INTEGER,
+    calls INTEGER,
+    self_time REAL,
+    inclusive_time REAL,
+    self_energy REAL,
+    inclusive_energy REAL
+);
+CREATE INDEX IF NOT EXISTS functions_by_key ON functions (func_key, run_id);
+CREATE INDEX IF NOT EXISTS functions_by_run ON functions (run_id);
+"""
+
+
+def function_key(key):
+    """`file:func` without the line number, so a function keeps its history when code above it moves."""
+    filename, _, func = key
+    return func if filename == "~" else f"{os.path.basename(filename)}:{func}"
+
+
+class RunHistory:
+    """Run history in a local SQLite file. Each call opens its own connection, so it is thread-safe."""
+
+    def __init__(self, path=DEFAULT_DB_PATH):
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with closing(self._connect()) as db, db:
+            db.execute("PRAGMA journal_mode=WAL")
+            db.executescript(SCHEMA)
+
+    def _connect(self):
+        db = sqlite3.connect(self.path, timeout=30)
+        db.execute("PRAGMA foreign_keys=ON")
+        return db
+
+    def record_run(self, script_name, source, settings, report):
+        """Stores one run and its per-function rows; returns the new run id."""
+        watts = report["energy"]["watts"]
+        stats = report["stats"]
+        total_energy = run_energy(report)
+
+        with closing(self._connect()) as db, db:
+            cur = db.execute(
+                "INSERT INTO runs (script_name, script_hash, created_at, settings, total_energy,"
+                " wall_time, watts, energy_source) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (script_name, hashlib.sha256(source.encode("utf-8")).hexdigest(), time.time(),
+                 json.dumps(settings, sort_keys=True), total_energy, report["wall_time"], watts,
+                 report["energy"]["source"]),
+            )
+            run_id = cur.lastrowid
+            db.executemany(
+                "INSERT INTO functions (run_id, func_key, line, calls, self_time, inclusive_time,"
+                " self_energy, inclusive_energy) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                ((run_id, function_key(key), key[1], data[1], data[2], data[3], data[2] * watts, data[3] * watts)
+                 for key, data in stats.items()),
+            )
+        return run_id
+
+    def scripts(self):
+        """(script_name, run count, last run time) for every script, most recently run first."""
+        with closing(self._connect()) as db:
+            return db.execute(
+                "SELECT script_name, COUNT(*), MAX(created_at) FROM runs"
+                " GROUP BY script_name ORDER BY MAX(created_at) DESC"
+            ).fetchall()
+
+    def script_trend(self, script_name, limit=500):
+        """The latest `limit` runs of a script, oldest first: (run id, time, total J, wall s, hash)."""
+        with closing(self._connect()) as db:
+            rows = db.execute(
+                "SELECT id, created_at, total_energy, wall_time, script_hash FROM runs"
+                " WHERE script_name = ? ORDER BY created_at DESC LIMIT ?",
+                (script_name, limit),
+            ).fetchall()
+        return rows[::-1]
+
+    def top_functions(self, script_name, limit=20):
+        """Function keys of the script's latest run, by self energy."""
+        with closing(self._connect()) as db:
+            return [row[0] for row in db.execute(
+                "SELECT func_key FROM functions WHERE run_id ="
+                " (SELECT id FROM runs WHERE script_name = ? ORDER BY created_at DESC LIMIT 1)"
+                " GROUP BY func_key ORDER BY SUM(self_energy) DESC LIMIT ?",
+                (script_name, limit),
+            )]
+
+    def function_trend(self, script_name, func_key, limit=500):
+        """(time, self J, inclusive J, calls) of one function over the script's latest `limit` runs."""
+        with closing(self._connect()) as db:
+            rows = db.execute(
+                "SELECT r.created_at, SUM(f.self_energy), SUM(f.inclusive_energy), SUM(f.calls)"
+                " FROM functions f JOIN runs r ON r.id = f.run_id"
+                " WHERE f.func_key = ? AND r.script_name = ?"
+                " GROUP BY r.id ORDER BY r.created_at DESC LIMIT ?",
+                (func_key, script_name, limit),
+            ).fetchall()
+        return rows[::-1]
@@ -1,2 +0,0 @@
-# Enter Python code
-print('Hello')
\ No newline at end of file
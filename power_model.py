@@ -0,0 +1,183 @@
+"""Utilization- and frequency-aware CPU power model, used where RAPL counters can't be read.
+
+Per-CPU busy time comes from /proc/stat and clock speed from cpufreq. Each
+logical CPU draws `cpu_idle_watts` plus up to `cpu_active_watts` scaled by
+its utilization and by (frequency / max frequency) ** `frequency_exponent`;
+the socket adds a constant `base_watts`. A profile describes a machine with
+`cpus` logical CPUs: the host's load, in busy CPUs, is placed on that many
+modelled CPUs, so a profile draws the same power whatever host it runs on.
+A profile may also set `idle_watts`, the machine's power at rest, where
+that isn't the socket plus every CPU idle. Machine profiles live in
+power_profiles.json, optionally extended by the file named in
+ENERGY_PROFILER_POWER_PROFILES; ENERGY_PROFILER_MACHINE picks the default.
+"""
+import glob, json, os, re, threading, time
+
+DEFAULT_PROFILES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "power_profiles.json")
+USER_PROFILES_PATH = os.environ.get("ENERGY_PROFILER_POWER_PROFILES")
+DEFAULT_PROC_STAT = "/proc/stat"
+DEFAULT_CPU_ROOT = "/sys/devices/system/cpu"
+
+
+def load_profiles(path=DEFAULT_PROFILES_PATH, user_path=USER_PROFILES_PATH):
+    """(default profile name, {name: profile}); profiles in `user_path` add to or replace the built-in ones."""
+    with open(path) as f:
+        config = json.load(f)
+    if user_path and os.path.exists(user_path):
+        with open(user_path) as f:
+            user = json.load(f)
+        config["profiles"].update(user.get("profiles", {}))
+        config["default"] = user.get("default", config["default"])
+    default = os.environ.get("ENERGY_PROFILER_MACHINE", config["default"])
+    if default not in config["profiles"]:
+        default = config["default"]  # a stale or mistyped ENERGY_PROFILER_MACHINE
+    return default, config["profiles"]
+
+
+def machine_profile(name=None):
+    """(name, profile) for a profile name, or the configured default."""
+    default, profiles = load_profiles()
+    name = name or default
+    if name not in profiles:
+        raise ValueError(f"unknown machine profile {name!r}; known: {', '.join(sorted(profiles))}")
+    return name, profiles[name]
+
+
+def proc_stat_readable(path=DEFAULT_PROC_STAT):
+    """True if per-CPU utilization can be read, i.e. the power model (and its host-wide view) applies."""
+    try:
+        return bool(read_proc_stat(path))
+    except OSError:
+        return False
+
+
+def read_proc_stat(path=DEFAULT_PROC_STAT):
+    """{cpu index: (busy jiffies, total jiffies)} from the per-CPU lines of /proc/stat."""
+    cpus = {}
+    with open(path) as f:
+        for line in f:
+            match = re.match(r"cpu(\d+)\s", line)
+            if match:
+                # user nice system idle iowait irq softirq steal (guest time is already in user)
+                fields = [int(v) for v in line.split()[1:9]]
+                total = sum(fields)
+                cpus[int(match.group(1))] = (total - fields[3] - fields[4], total)
+    return cpus
+
+
+def host_busy_seconds(before, after):
+    """CPU seconds every CPU of the host spent busy between two read_proc_stat() readings."""
+    jiffies = sum(busy - before.get(cpu, (busy, 0))[0] for cpu, (busy, _) in after.items())
+    return jiffies / os.sysconf("SC_CLK_TCK")
+
+
+def read_frequencies(root=DEFAULT_CPU_ROOT):
+    """{cpu index: current / maximum frequency}; empty where cpufreq isn't exposed (VMs, containers)."""
+    ratios = {}
+    for path in glob.glob(os.path.join(root, "cpu[0-9]*", "cpufreq")):
+        try:
+            with open(os.path.join(path, "scaling_cur_freq")) as f:
+                current = int(f.read())
+            with open(os.path.join(path, "cpuinfo_max_freq")) as f:
+                maximum = int(f.read())
+        except (OSError, ValueError):
+            continue
+        if maximum > 0:
+            cpu = int(os.path.basename(os.path.dirname(path))[3:])
+            ratios[cpu] = min(current / maximum, 1.0)
+    return ratios
+
+
+def cpu_load(profile, utilization, frequency_ratio=1.0):
+    """One host CPU's work in fully busy CPUs at maximum frequency: utilization (0-1) scaled by clock speed."""
+    return utilization * frequency_ratio ** profile["frequency_exponent"]
+
+
+def cpus_watts(profile, load, cpus=None):
+    """Power of the profile's CPUs carrying `load` busy CPUs (capped at every CPU busy)."""
+    cpus = cpus or profile.get("cpus") or os.cpu_count() or 1
+    dynamic = profile["cpu_active_watts"] - profile["cpu_idle_watts"]
+    return profile["cpu_idle_watts"] * cpus + dynamic * min(load, cpus)
+
+
+def idle_watts(profile, cpus=None):
+    """Baseline power while nothing runs: the profile's `idle_watts`, or the socket plus every CPU at rest."""
+    if "idle_watts" in profile:
+        return profile["idle_watts"]
+    return profile["base_watts"] + profile["cpu_idle_watts"] * (cpus or profile.get("cpus") or os.cpu_count() or 1)
+
+
+class PowerModelMeter:
+    """Integrates modelled power between start() and stop(), with the same interface as RaplMeter.
+
+    joules() reports a "package" domain (base plus CPUs) and a
+    "package/core" subdomain (CPUs only), so rapl.total_joules applies.
+    """
+
+    def __init__(self, profile, name=None, stat_path=DEFAULT_PROC_STAT, cpu_root=DEFAULT_CPU_ROOT,
+                 poll_interval=1.0):
+        self.profile = profile
+        self.name = name
+        self.stat_path = stat_path
+        self.cpu_root = cpu_root
+        self.poll_interval = poll_interval
+        self._base = 0.0
+        self._cpus = 0.0
+        self._utilization = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    @property
+    def available(self):
+        return proc_stat_readable(self.stat_path)
+
+    def start(self):
+        with self._lock:
+            self._last = read_proc_stat(self.stat_path)
+            self._last_time = time.perf_counter()
+            self._base = self._cpus = 0.0
+        if self.poll_interval:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._poll_loop, name="power-model-poll", daemon=True)
+            self._thread.start()
+        return self
+
+    def poll(self):
+        """Charges the time since the last poll at the power implied by each CPU's utilization."""
+        with self._lock:
+            now, now_time = read_proc_stat(self.stat_path), time.perf_counter()
+            frequencies = read_frequencies(self.cpu_root)
+            seconds = now_time - self._last_time
+            load = 0.0
+            for cpu, (busy, total) in now.items():
+                last_busy, last_total = self._last.get(cpu, (busy, total))
+                if total > last_total:
+                    self._utilization[cpu] = (busy - last_busy) / (total - last_total)
+                # no tick since the last poll: assume the CPU kept its last known utilization
+                load += cpu_load(self.profile, self._utilization.get(cpu, 0.0), frequencies.get(cpu, 1.0))
+            self._cpus += cpus_watts(self.profile, load, self.profile.get("cpus", len(now))) * seconds
+            self._base += self.profile["base_watts"] * seconds
+            self._last, self._last_time = now, now_time
+
+    def joules(self):
+        with self._lock:
+            return {"package": self._base + self._cpus, "package/core": self._cpus}
+
+    def stop(self):
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+        self.poll()
+        return self.joules()
+
+    def _poll_loop(self):
+        while not self._stop.wait(self.poll_interval):
+            self.poll()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
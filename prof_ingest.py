@@ -0,0 +1,160 @@
+"""Ingestion of cProfile dumps collected elsewhere: .prof files, or zip/tar archives of them.
+
+Nothing is executed. A dump is the marshalled pstats dict that
+`cProfile.Profile.dump_stats` writes; many of them are merged with a tree
+reduction in the worker pool, and the result is wrapped in a report shaped
+like `profiler.profile_job`'s so the dashboard shows it like any other run.
+"""
+import io, marshal, math, os, tarfile, zipfile
+from energy import CPU_POWER_WATTS
+
+PROFILE_SUFFIXES = (".prof", ".pstats", ".profile")
+ARCHIVE_SUFFIXES = (".zip", ".tar", ".tar.gz", ".tgz", ".tar.bz2", ".tar.xz")
+MAX_TOTAL_BYTES = 2**30  # uncompressed dumps read from one upload; guards against archive bombs
+
+
+class ProfileImportError(ValueError):
+    """An upload that holds no readable profile dumps."""
+
+
+def read_upload(name, data, max_bytes=MAX_TOTAL_BYTES):
+    """[(name, bytes)] of every dump in an uploaded file: the file itself, or the dumps inside an archive.
+
+    Archive members are picked by suffix; anything else (READMEs, logs) is
+    ignored. A plain file is taken as a dump whatever its name.
+    """
+    lower = name.lower()
+    try:
+        if lower.endswith(".zip"):
+            with zipfile.ZipFile(io.BytesIO(data)) as archive:
+                members = [info for info in archive.infolist()
+                           if not info.is_dir() and info.filename.lower().endswith(PROFILE_SUFFIXES)]
+                _check_size(name, sum(info.file_size for info in members), max_bytes)
+                return [(f"{name}/{info.filename}", archive.read(info)) for info in members]
+        if lower.endswith(ARCHIVE_SUFFIXES):
+            with tarfile.open(fileobj=io.BytesIO(data)) as archive:
+                members = [member for member in archive.getmembers()
+                           if member.isfile() and member.name.lower().endswith(PROFILE_SUFFIXES)]
+                _check_size(name, sum(member.size for member in members), max_bytes)
+                return [(f"{name}/{member.name}", archive.extractfile(member).read()) for member in members]
+    except (zipfile.BadZipFile, tarfile.TarError, EOFError, OSError) as e:
+        raise ProfileImportError(f"{name} is not a readable archive ({e})") from None
+    return [(name, data)]
+
+
+def _check_size(name, total, max_bytes):
+    if total > max_bytes:
+        raise ProfileImportError(f"{name} unpacks to {total / 2**20:.0f} MB of profiles, "
+                                 f"more than the {max_bytes / 2**20:.0f} MB limit")
+
+
+def load_stats(data):
+    """The pstats dict in one dump; ProfileImportError if it isn't one."""
+    try:
+        stats = marshal.loads(data)
+    except (EOFError, ValueError, TypeError) as e:
+        raise ProfileImportError(f"not a cProfile dump ({e})") from None
+    if not isinstance(stats, dict):
+        raise ProfileImportError("not a cProfile dump")
+    for key, value in stats.items():
+        if not (isinstance(key, tuple) and len(key) == 3 and isinstance(value, tuple) and len(value) == 5
+                and isinstance(value[4], dict)):
+            raise ProfileImportError("not a cProfile dump")
+        break  # the first entry is enough to tell a dump from other marshalled data
+    return stats
+
+
+def merge_into(target, stats):
+    """Adds `stats` into `target` in place, with the arithmetic of pstats.Stats.add.
+
+    Stats.add copies every caller dict on every merge; owning `target`
+    lets this update them in place, which is what keeps thousands of
+    merges fast.
+    """
+    for func, (cc, nc, tt, ct, callers) in stats.items():
+        old = target.get(func)
+        if old is None:
+            target[func] = (cc, nc, tt, ct, dict(callers))
+            continue
+        merged = old[4]
+        for caller, edge in callers.items():
+            previous = merged.get(caller)
+            if previous is None:
+                merged[caller] = edge
+            elif isinstance(edge, tuple):  # cProfile's (cc, nc, tt, ct) edges
+                merged[caller] = tuple(a + b for a, b in zip(edge, previous))
+            else:  # the pure-Python profile module's call counts
+                merged[caller] = edge + previous
+        target[func] = (old[0] + cc, old[1] + nc, old[2] + tt, old[3] + ct, merged)
+    return target
+
+
+def merge_job(dumps):
+    """Worker entry point: merges a batch of (name, marshalled stats); returns (marshalled result, skipped).
+
+    `skipped` lists (name, reason) for every input that wasn't a dump.
+    """
+    merged, skipped = {}, []
+    for name, data in dumps:
+        try:
+            merge_into(merged, load_stats(data))
+        except ProfileImportError as e:
+            skipped.append((name, str(e)))
+    return marshal.dumps(merged), skipped
+
+
+def merge_in_pool(pool, dumps):
+    """Merges many dumps in parallel; returns (stats, skipped).
+
+    The first level splits the dumps evenly across the pool's workers,
+    which parse and merge their share; every further level merges the
+    partial results in pairs, so N dumps take one parsing pass plus
+    log2(workers) rounds of merging.
+    """
+    level = list(dumps)
+    if not level:
+        raise ProfileImportError("no profile dumps found")
+    skipped, first = [], True
+    while first or len(level) > 1:
+        batch = max(math.ceil(len(level) / pool.workers), 2) if first else 2
+        futures = [pool.submit(merge_job, (level[i:i + batch],)) for i in range(0, len(level), batch)]
+        level = []
+        for i, future in enumerate(futures):
+            data, bad = future.result()
+            skipped.extend(bad)
+            level.append((f"<partial {i}>", data))
+        first = False
+    stats = marshal.loads(level[0][1])
+    if not stats:
+        raise ProfileImportError("none of the files is a cProfile dump")
+    return stats, skipped
+
+
+def import_report(name, stats, files, skipped=(), watts=CPU_POWER_WATTS):
+    """A report for merged dumps, with the keys `profile_job` reports carry.
+
+    No power was measured when the dumps were recorded, so energy uses the
+    flat `watts` model, and the profiles' total time stands in for both
+    CPU and wall time.
+    """
+    busy = sum(data[2] for data in stats.values())
+    return {
+        "script": name,
+        "stats": stats,
+        "wall_time": busy,
+        "cpu_time": busy,
+        "energy": {"source": "imported", "domains": {}, "joules": None, "watts": watts,
+                   "idle_joules": 0.0, "idle_watts": 0.0, "clock": None},
+        "timeline": None,
+        "lines": None,
+        "memory": None,
+        "breakdown": None,
+        "outcome": None,
+        "imported": {"files": files, "skipped": list(skipped)},
+    }
+
+
+def profile_name(names):
+    """A label for an import: the one file's name, or how many files there were."""
+    names = [os.path.basename(name) for name in names]
+    return names[0] if len(names) == 1 else f"{len(names)} uploaded files"
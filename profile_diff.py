@@ -0,0 +1,106 @@
+"""Function-by-function comparison of two profiles: which functions got cheaper or dearer between runs.
+
+Functions are joined on their exact (file, line, func) key first. An edit
+above a function moves its line, so whatever is left on either side is
+joined again on (file name, function name) and paired by nearest line;
+only what still has no partner counts as added or removed. Both joins are
+dict lookups, so two profiles of 100k functions diff in well under a
+second.
+"""
+import heapq, os
+from energy import CPU_POWER_WATTS
+
+DEFAULT_TOP_N = 10
+MAX_FUZZY_PAIRS = 10000  # same-named functions in one file beyond this are paired in line order
+
+
+def _nearest(old, new):
+    """Pairs same-named functions by line: in order when the counts match, else closest lines first."""
+    old, new = sorted(old, key=lambda key: key[1]), sorted(new, key=lambda key: key[1])
+    if len(old) == len(new) or len(old) * len(new) > MAX_FUZZY_PAIRS:
+        pairs = list(zip(old, new))
+    else:
+        candidates = sorted((abs(a[1] - b[1]), i, j) for i, a in enumerate(old) for j, b in enumerate(new))
+        used_old, used_new, pairs = set(), set(), []
+        for _, i, j in candidates:
+            if i not in used_old and j not in used_new:
+                used_old.add(i)
+                used_new.add(j)
+                pairs.append((old[i], new[j]))
+    matched_old = {a for a, _ in pairs}
+    matched_new = {b for _, b in pairs}
+    pairs.extend((key, None) for key in old if key not in matched_old)
+    pairs.extend((None, key) for key in new if key not in matched_new)
+    return pairs
+
+
+def align(before, after):
+    """(key before or None, key after or None) for every function of two pstats-style dicts."""
+    pairs = [(key, key) for key in before.keys() & after.keys()]
+    old, new, basenames = {}, {}, {}
+    for side, keys in ((old, before.keys() - after.keys()), (new, after.keys() - before.keys())):
+        for key in keys:
+            filename, _, func = key
+            if filename not in basenames:
+                basenames[filename] = os.path.basename(filename)
+            side.setdefault((basenames[filename], func), []).append(key)
+    for loose, keys in old.items():
+        partners = new.pop(loose, None)
+        if partners and len(keys) == len(partners) == 1:
+            pairs.append((keys[0], partners[0]))
+        elif partners:
+            pairs.extend(_nearest(keys, partners))
+        else:
+            pairs.extend((key, None) for key in keys)
+    for keys in new.values():
+        pairs.extend((None, key) for key in keys)
+    return pairs
+
+
+class ProfileDiff:
+    """Per-function deltas between two runs.
+
+    Each row is (key before, key after, calls before, calls after, self
+    time before, self time after, joules before, joules after); a key is
+    None where the function exists on one side only. Energy is self time
+    at each run's own watts, so a run measured at a different power level
+    is compared in joules, not seconds.
+    """
+
+    def __init__(self, before, after, watts_before=CPU_POWER_WATTS, watts_after=CPU_POWER_WATTS):
+        self.rows = []
+        for old, new in align(before, after):
+            calls_old, time_old = (before[old][1], before[old][2]) if old else (0, 0.0)
+            calls_new, time_new = (after[new][1], after[new][2]) if new else (0, 0.0)
+            self.rows.append((old, new, calls_old, calls_new, time_old, time_new,
+                              time_old * watts_before, time_new * watts_after))
+
+    @staticmethod
+    def key(row):
+        """The function's current key, or its old one if it was removed."""
+        return row[1] or row[0]
+
+    @staticmethod
+    def delta(row):
+        return row[7] - row[6]
+
+    def total_delta(self):
+        return sum(row[7] - row[6] for row in self.rows)
+
+    def regressions(self, n=DEFAULT_TOP_N):
+        """The `n` rows whose energy grew the most, largest first."""
+        return [row for row in heapq.nlargest(n, self.rows, key=self.delta) if self.delta(row) > 0]
+
+    def wins(self, n=DEFAULT_TOP_N):
+        """The `n` rows whose energy fell the most, largest saving first."""
+        return [row for row in heapq.nsmallest(n, self.rows, key=self.delta) if self.delta(row) < 0]
+
+    def moved(self):
+        """Rows matched despite a changed key: the function's line (or file path) moved."""
+        return [row for row in self.rows if row[0] and row[1] and row[0] != row[1]]
+
+    def added(self):
+        return [row for row in self.rows if row[0] is None]
+
+    def removed(self):
+        return [row for row in self.rows if row[1] is None]
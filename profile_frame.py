@@ -0,0 +1,60 @@
+"""Columnar, vectorized view of a profile, built once per run and shared by every tab and export."""
+import numpy as np
+import pandas as pd
+from energy import CPU_POWER_WATTS
+
+
+class ProfileFrame:
+    """One row per function with compact dtypes; energies are whole-column operations.
+
+    Columns: file/name (category), line (int32), prim_calls/calls (int64),
+    self_time/inclusive_time (float64, seconds) and self_energy/
+    inclusive_energy (float64, joules at `watts`).
+    """
+
+    def __init__(self, df, watts=CPU_POWER_WATTS):
+        self.df = df
+        self.watts = watts
+
+    @classmethod
+    def from_stats(cls, stats, watts=CPU_POWER_WATTS):
+        if stats:
+            keys, values = zip(*stats.items())
+            files, lines, names = zip(*keys)
+            prim_calls, calls, self_time, inclusive_time = zip(*(v[:4] for v in values))
+        else:
+            files = lines = names = prim_calls = calls = self_time = inclusive_time = ()
+
+        df = pd.DataFrame({
+            "file": pd.Categorical(files),
+            "line": np.asarray(lines, dtype=np.int32),
+            "name": pd.Categorical(names),
+            "prim_calls": np.asarray(prim_calls, dtype=np.int64),
+            "calls": np.asarray(calls, dtype=np.int64),
+            "self_time": np.asarray(self_time, dtype=np.float64),
+            "inclusive_time": np.asarray(inclusive_time, dtype=np.float64),
+        })
+        df["self_energy"] = df["self_time"] * watts
+        df["inclusive_energy"] = df["inclusive_time"] * watts
+        return cls(df, watts)
+
+    def __len__(self):
+        return len(self.df)
+
+    @property
+    def total_time(self):
+        return float(self.df["self_time"].sum())
+
+    @property
+    def total_energy(self):
+        """Sum of self energies: nested calls are counted once."""
+        return float(self.df["self_energy"].sum())
+
+    def top(self, n=10, by="self_energy"):
+        """The n most expensive rows (partial selection, not a full sort)."""
+        return self.df.nlargest(n, by)
+
+    @staticmethod
+    def labels(rows):
+        """The `(file, line, name)` labels the dashboard has always shown, for a few selected rows."""
+        return [str((f, int(l), n)) for f, l, n in zip(rows["file"], rows["line"], rows["name"])]
@@ -0,0 +1,142 @@
+"""Measured energy from the Linux RAPL powercap interface (/sys/class/powercap/intel-rapl*)."""
+import os, threading
+
+DEFAULT_POWERCAP_ROOT = os.environ.get("ENERGY_PROFILER_POWERCAP_ROOT", "/sys/class/powercap")
+
+
+def _read_int(path):
+    with open(path) as f:
+        return int(f.read().strip())
+
+
+def _read_name(path):
+    with open(path) as f:
+        return f.read().strip()
+
+
+def domain_kind(label):
+    """'package', 'core', 'uncore', 'dram' or 'psys' for a domain label."""
+    return label.rsplit("/", 1)[-1].split("-")[0]
+
+
+class RaplDomain:
+    """One energy counter, e.g. `package-0`, `package-0/core` or `package-0/dram`."""
+
+    def __init__(self, label, path, max_range_uj):
+        self.label = label
+        self.path = path
+        self.max_range_uj = max_range_uj
+
+    def read_uj(self):
+        return _read_int(os.path.join(self.path, "energy_uj"))
+
+
+def discover_domains(root=DEFAULT_POWERCAP_ROOT):
+    """Finds every readable intel-rapl zone under `root`; returns [] when RAPL is unavailable.
+
+    Top-level zones (`intel-rapl:0`) are packages, nested zones (`intel-rapl:0:1`)
+    are their core/uncore/dram subdomains. Counters that exist but are not
+    readable (recent kernels restrict energy_uj to root) are skipped.
+    """
+    try:
+        entries = sorted(os.listdir(root))
+    except OSError:
+        return []
+
+    zones = {}
+    for entry in entries:
+        if not entry.startswith("intel-rapl:"):
+            continue
+        path = os.path.join(root, entry)
+        try:
+            name = _read_name(os.path.join(path, "name"))
+            _read_int(os.path.join(path, "energy_uj"))
+            max_range = _read_int(os.path.join(path, "max_energy_range_uj"))
+        except (OSError, ValueError):
+            continue
+        zones[entry] = (name, path, max_range)
+
+    domains = []
+    for entry, (name, path, max_range) in zones.items():
+        parts = entry.split(":")
+        if len(parts) == 3 and ":".join(parts[:2]) in zones:
+            label = f"{zones[':'.join(parts[:2])][0]}/{name}"
+        else:
+            label = name
+        domains.append(RaplDomain(label, path, max_range))
+    return domains
+
+
+def counter_delta(before, after, max_range_uj):
+    """Microjoules consumed between two readings, allowing for one counter wraparound."""
+    if after >= before:
+        return after - before
+    return after + max_range_uj - before
+
+
+class RaplMeter:
+    """Accumulates joules per RAPL domain between start() and stop().
+
+    A counter can wrap more than once during a long run (the package range is
+    ~262 kJ, i.e. under an hour at 100 W), so the meter can poll from a
+    background thread; samplers may also call poll() themselves.
+    """
+
+    def __init__(self, root=DEFAULT_POWERCAP_ROOT, poll_interval=1.0):
+        self.domains = discover_domains(root)
+        self.poll_interval = poll_interval
+        self._last = {}
+        self._totals = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    @property
+    def available(self):
+        return bool(self.domains)
+
+    def start(self):
+        with self._lock:
+            self._last = {d.label: d.read_uj() for d in self.domains}
+            self._totals = {d.label: 0 for d in self.domains}
+        if self.domains and self.poll_interval:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._poll_loop, name="rapl-poll", daemon=True)
+            self._thread.start()
+        return self
+
+    def poll(self):
+        """Folds the counter movement since the last reading into the totals."""
+        with self._lock:
+            for d in self.domains:
+                now = d.read_uj()
+                self._totals[d.label] += counter_delta(self._last[d.label], now, d.max_range_uj)
+                self._last[d.label] = now
+
+    def joules(self):
+        """Energy per domain label accumulated so far."""
+        with self._lock:
+            return {label: uj / 1e6 for label, uj in self._totals.items()}
+
+    def stop(self):
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+        self.poll()
+        return self.joules()
+
+    def _poll_loop(self):
+        while not self._stop.wait(self.poll_interval):
+            self.poll()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def total_joules(domain_joules):
+    """Whole-machine energy: packages plus DRAM. Core/uncore are already inside the package."""
+    return sum(j for label, j in domain_joules.items() if domain_kind(label) in ("package", "dram"))
@@ -0,0 +1,120 @@
+"""Background thread that samples a process's resource usage into preallocated ring buffers."""
+import os, threading, time
+import numpy as np
+import psutil
+from rapl import total_joules
+
+DEFAULT_INTERVAL = 0.1    # seconds between samples
+DEFAULT_CAPACITY = 4096   # samples kept; older ones are overwritten
+
+
+class ResourceSampler:
+    """Records CPU per core, RSS, context switches, threads and I/O at a fixed interval.
+
+    Every metric lives in its own fixed-size NumPy array indexed modulo
+    `capacity`, so sampling never allocates per tick and a long job keeps
+    only its most recent `capacity` samples. If a RaplMeter is given it is
+    polled on each tick and its running total is recorded too.
+    """
+
+    def __init__(self, pid=None, interval=DEFAULT_INTERVAL, capacity=DEFAULT_CAPACITY, meter=None):
+        self.interval = interval
+        self.capacity = capacity
+        self.meter = meter
+        self.cores = psutil.cpu_count() or 1
+        self._proc = psutil.Process(pid or os.getpid())
+
+        self.t = np.zeros(capacity, dtype=np.float64)
+        self.cpu_per_core = np.zeros((capacity, self.cores), dtype=np.float32)
+        self.process_cpu = np.zeros(capacity, dtype=np.float32)
+        self.rss = np.zeros(capacity, dtype=np.int64)
+        self.ctx_voluntary = np.zeros(capacity, dtype=np.int64)
+        self.ctx_involuntary = np.zeros(capacity, dtype=np.int64)
+        self.threads = np.zeros(capacity, dtype=np.int32)
+        self.read_bytes = np.zeros(capacity, dtype=np.int64)
+        self.write_bytes = np.zeros(capacity, dtype=np.int64)
+        self.joules = np.zeros(capacity, dtype=np.float64)
+
+        self._count = 0
+        self._t0 = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        # The first cpu_percent() call only primes psutil's counters.
+        psutil.cpu_percent(percpu=True)
+        self._proc.cpu_percent()
+        self._t0 = time.perf_counter()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="resource-sampler", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+            self._sample()
+        return self
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _run(self):
+        deadline = time.perf_counter() + self.interval
+        while not self._stop.wait(max(0.0, deadline - time.perf_counter())):
+            self._sample()
+            deadline += self.interval
+
+    def _sample(self):
+        i = self._count % self.capacity
+        self.t[i] = time.perf_counter() - self._t0
+        self.cpu_per_core[i] = psutil.cpu_percent(percpu=True)[:self.cores]
+
+        proc = self._proc
+        try:
+            with proc.oneshot():
+                self.process_cpu[i] = proc.cpu_percent()
+                self.rss[i] = proc.memory_info().rss
+                ctx = proc.num_ctx_switches()
+                self.ctx_voluntary[i] = ctx.voluntary
+                self.ctx_involuntary[i] = ctx.involuntary
+                self.threads[i] = proc.num_threads()
+                try:
+                    io = proc.io_counters()
+                    self.read_bytes[i] = io.read_bytes
+                    self.write_bytes[i] = io.write_bytes
+                except (AttributeError, psutil.AccessDenied):
+                    pass  # io_counters is not available on macOS
+        except psutil.Error:
+            return
+
+        if self.meter is not None:
+            self.meter.poll()
+            self.joules[i] = total_joules(self.meter.joules())
+
+        self._count += 1
+
+    def series(self):
+        """The samples in chronological order as plain lists, ready to marshal or plot."""
+        n = min(self._count, self.capacity)
+        if self._count > self.capacity:
+            order = np.roll(np.arange(self.capacity), -(self._count % self.capacity))
+        else:
+            order = np.arange(n)
+        return {
+            "t": self.t[order].tolist(),
+            "cpu_per_core": self.cpu_per_core[order].T.tolist(),
+            "process_cpu": self.process_cpu[order].tolist(),
+            "rss": self.rss[order].tolist(),
+            "ctx_voluntary": self.ctx_voluntary[order].tolist(),
+            "ctx_involuntary": self.ctx_involuntary[order].tolist(),
+            "threads": self.threads[order].tolist(),
+            "read_bytes": self.read_bytes[order].tolist(),
+            "write_bytes": self.write_bytes[order].tolist(),
+            "joules": self.joules[order].tolist() if self.meter is not None else [],
+        }
@@ -0,0 +1,137 @@
+"""Content-addressed cache for profiling results: in-memory LRU in front of a size-bounded disk store."""
+import hashlib, json, os, pickle, tempfile, threading
+from collections import OrderedDict
+
+DEFAULT_CACHE_DIR = os.environ.get(
+    "ENERGY_PROFILER_CACHE_DIR",
+    os.path.join(os.path.expanduser("~"), ".cache", "energy-profiler"),
+)
+DEFAULT_MEMORY_ITEMS = 64
+DEFAULT_DISK_MAX_BYTES = 256 * 1024 * 1024
+
+
+def cache_key(source, settings=None):
+    """Hashes the source code together with the profiler settings that produced the result."""
+    h = hashlib.sha256()
+    h.update(source.encode("utf-8") if isinstance(source, str) else source)
+    h.update(b"\0")
+    h.update(json.dumps(settings or {}, sort_keys=True, default=str).encode("utf-8"))
+    return h.hexdigest()
+
+
+class ResultCache:
+    """Two-tier cache: hot entries stay in memory, everything else lives on disk.
+
+    The disk tier is shared by every process pointed at the same directory, so
+    results survive server restarts. Writes are atomic (temp file + rename) and
+    the least recently used files are evicted once the directory grows past
+    `disk_max_bytes`.
+    """
+
+    def __init__(self, directory=DEFAULT_CACHE_DIR, memory_items=DEFAULT_MEMORY_ITEMS,
+                 disk_max_bytes=DEFAULT_DISK_MAX_BYTES):
+        self.directory = directory
+        self.memory_items = memory_items
+        self.disk_max_bytes = disk_max_bytes
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        self._disk_bytes = sum(size for _, _, size in self._disk_entries())
+
+    def get(self, key):
+        """Returns the cached value for `key`, or None on a miss."""
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                return self._memory[key]
+
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                value = pickle.load(f)
+            os.utime(path)  # refresh mtime so eviction is LRU, not FIFO
+        except (OSError, EOFError, pickle.UnpicklingError):
+            return None
+
+        self._remember(key, value)
+        return value
+
+    def put(self, key, value):
+        self._remember(key, value)
+
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        replaced = os.path.getsize(path) if os.path.exists(path) else 0
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp, path)
+        except OSError:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            return
+
+        with self._lock:
+            self._disk_bytes += os.path.getsize(path) - replaced
+            over = self._disk_bytes > self.disk_max_bytes
+        if over:
+            self._evict()
+
+    def get_or_compute(self, key, compute):
+        """Returns the cached value or computes, stores and returns it. None results are not cached."""
+        value = self.get(key)
+        if value is None:
+            value = compute()
+            if value is not None:
+                self.put(key, value)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+        for path, _, _ in self._disk_entries():
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+        with self._lock:
+            self._disk_bytes = 0
+
+    def _remember(self, key, value):
+        with self._lock:
+            self._memory[key] = value
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.memory_items:
+                self._memory.popitem(last=False)
+
+    def _path(self, key):
+        return os.path.join(self.directory, key[:2], key + ".pkl")
+
+    def _disk_entries(self):
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                if not name.endswith(".pkl"):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                yield path, st.st_mtime, st.st_size
+
+    def _evict(self):
+        # Trim to 90% of the budget so a burst of writes doesn't rescan on every put.
+        entries = sorted(self._disk_entries(), key=lambda e: e[1])
+        total = sum(size for _, _, size in entries)
+        target = self.disk_max_bytes * 0.9
+        for path, _, size in entries:
+            if total <= target:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+        with self._lock:
+            self._disk_bytes = total
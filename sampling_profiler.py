@@ -0,0 +1,138 @@
+"""Statistical stack sampler: a low-overhead alternative to cProfile's per-call hooks."""
+import sys, threading, time
+from collections import Counter
+
+DEFAULT_RATE = 200      # samples per second
+DEFAULT_MAX_DEPTH = 256
+
+
+def code_key(code):
+    """The (file, line, func) key cProfile uses for a Python function."""
+    return (code.co_filename, code.co_firstlineno, code.co_name)
+
+
+def walk_stack(frame, codes, boundary=None, max_depth=DEFAULT_MAX_DEPTH):
+    """(stack, cut): the keys of `frame` and its callers, innermost first.
+
+    `cut` is False if the walk reached the thread's outermost frame rather
+    than stopping at `boundary` or `max_depth`. `codes` caches code object
+    -> key across calls, so each sample only builds a tuple of cached keys.
+    """
+    stack = []
+    while frame is not None and frame is not boundary and len(stack) < max_depth:
+        code = frame.f_code
+        key = codes.get(code)
+        if key is None:
+            key = codes[code] = code_key(code)
+        stack.append(key)
+        frame = frame.f_back
+    return tuple(stack), frame is not None
+
+
+def collapse_stacks(stacks, seconds_per_sample, seconds=None):
+    """Turns {stack: samples} into a pstats-style stats dict.
+
+    A stack is a tuple of (file, line, func) keys, innermost frame first.
+    Self (tt) time comes from samples where a function was on top of the
+    stack, inclusive (ct) time from samples where it appeared anywhere, with
+    recursion counted once per sample. Since sampling cannot see calls, the
+    call-count fields hold the inclusive sample count. Caller edges carry the
+    same numbers per caller, so call-graph consumers work unchanged.
+    `seconds`, if given, maps each stack to the time its samples stand for,
+    in place of samples x `seconds_per_sample`.
+    """
+    self_time = Counter()
+    incl_samples = Counter()
+    incl_time = Counter()
+    edge_self = Counter()
+    edge_samples = Counter()
+    edge_incl = Counter()
+
+    for stack, n in stacks.items():
+        if not stack:
+            continue
+        t = seconds[stack] if seconds is not None else n * seconds_per_sample
+        self_time[stack[0]] += t
+        for func in set(stack):
+            incl_samples[func] += n
+            incl_time[func] += t
+        if len(stack) > 1:
+            edge_self[(stack[1], stack[0])] += t
+        for edge in set(zip(stack[1:], stack)):
+            edge_samples[edge] += n
+            edge_incl[edge] += t
+
+    callers = {}
+    for edge, n in edge_samples.items():
+        caller, callee = edge
+        callers.setdefault(callee, {})[caller] = (n, n, edge_self[edge], edge_incl[edge])
+
+    stats = {}
+    for func, n in incl_samples.items():
+        stats[func] = (n, n, self_time[func], incl_time[func], callers.get(func, {}))
+    return stats
+
+
+class StackSampler:
+    """Samples one thread's Python stack from a background thread at `rate` Hz.
+
+    Only frames above `boundary` (typically the frame that exec()s the
+    profiled script) are recorded, so the harness itself never shows up.
+    While running, the interpreter's switch interval is shortened so the
+    sampler thread actually gets the GIL at the requested rate.
+    """
+
+    def __init__(self, thread_id=None, rate=DEFAULT_RATE, boundary=None, max_depth=DEFAULT_MAX_DEPTH):
+        self.thread_id = thread_id or threading.get_ident()
+        self.rate = rate
+        self.boundary = boundary
+        self.max_depth = max_depth
+        self.stacks = Counter()
+        self.samples = 0
+        self.ticks = 0
+        self.elapsed = 0.0
+        self._stop = threading.Event()
+        self._thread = None
+        self._switch_interval = None
+
+    def start(self):
+        self._switch_interval = sys.getswitchinterval()
+        sys.setswitchinterval(min(self._switch_interval, 0.5 / self.rate))
+        self._stop.clear()
+        self._started = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+            self.elapsed = time.perf_counter() - self._started
+            sys.setswitchinterval(self._switch_interval)
+        return self
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _run(self):
+        interval = 1.0 / self.rate
+        codes = {}
+        while not self._stop.wait(interval):
+            self.ticks += 1
+            frame = sys._current_frames().get(self.thread_id)
+            stack, cut = walk_stack(frame, codes, self.boundary, self.max_depth)
+            if not cut and self.boundary is not None:
+                continue  # target is outside the profiled region (not started or already done)
+            if stack:
+                self.stacks[stack] += 1
+                self.samples += 1
+
+    def stats(self):
+        """The collapsed samples as a pstats-style dict, timed by the observed sampling interval."""
+        seconds_per_sample = self.elapsed / self.ticks if self.ticks else 1.0 / self.rate
+        return collapse_stacks(self.stacks, seconds_per_sample)
@@ -0,0 +1,247 @@
+"""AST slicing of a script down to its energy hotspots, and splicing rewritten functions back in.
+
+Large modules don't fit in a prompt, and most of their code spent no
+energy. The slice holds the top functions by attributable time plus the
+module-level definitions they reference directly; the model rewrites only
+those functions and `HotspotSlice.splice` puts them back into the full file.
+"""
+import ast, textwrap
+
+DEFAULT_TOP = 5
+SLICE_MIN_LINES = 150
+MAX_CONTEXT_LINES = 40
+
+
+class Unit:
+    """A rewritable function: a module-level def or a method of a module-level class."""
+
+    def __init__(self, node, class_name=None):
+        self.node = node
+        self.class_name = class_name
+        self.name = f"{class_name}.{node.name}" if class_name else node.name
+        self.start = min([node.lineno] + [d.lineno for d in node.decorator_list])
+        self.end = node.end_lineno
+        self.indent = node.col_offset
+
+
+def find_units(tree):
+    units = []
+    for node in tree.body:
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            units.append(Unit(node))
+        elif isinstance(node, ast.ClassDef):
+            units.extend(Unit(child, node.name) for child in node.body
+                         if isinstance(child, (ast.FunctionDef, ast.AsyncFunctionDef)))
+    return units
+
+
+def unit_for_line(units, line, func=None):
+    """The unit whose lines hold `line`; None for module-level code, whose code object starts at line 1 too."""
+    if func == "<module>":
+        return None
+    for unit in units:
+        if unit.start <= line <= unit.end:
+            return unit
+    return None
+
+
+def attributable_time(stats, filename):
+    """Seconds spent in each code object of `filename`, including the builtins and library calls it makes.
+
+    Self time alone would hide a function whose cost is one `sorted()` or
+    numpy call, so the inclusive time of every edge into code outside the
+    file is charged to the calling function.
+    """
+    seconds = {}
+    for key, data in stats.items():
+        if key[0] == filename:
+            seconds[key] = seconds.get(key, 0.0) + data[2]
+        else:
+            for caller, edge in data[4].items():
+                if caller[0] == filename:
+                    seconds[caller] = seconds.get(caller, 0.0) + edge[3]
+    return seconds
+
+
+def module_definitions(tree):
+    """name -> module-level statement that binds it (defs, classes, imports, simple assignments)."""
+    defs = {}
+    for node in tree.body:
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+            defs[node.name] = node
+        elif isinstance(node, (ast.Import, ast.ImportFrom)):
+            for alias in node.names:
+                defs[(alias.asname or alias.name).split(".")[0]] = node
+        elif isinstance(node, (ast.Assign, ast.AnnAssign)):
+            targets = node.targets if isinstance(node, ast.Assign) else [node.target]
+            for target in targets:
+                for name in ast.walk(target):
+                    if isinstance(name, ast.Name):
+                        defs[name.id] = node
+    return defs
+
+
+def direct_dependencies(unit, definitions, units_by_name):
+    """Module-level definitions and sibling methods the unit's body refers to, in no particular order."""
+    deps = []
+    for node in ast.walk(unit.node):
+        if isinstance(node, ast.Name) and isinstance(node.ctx, ast.Load) and node.id in definitions:
+            deps.append(definitions[node.id])
+        elif (unit.class_name and isinstance(node, ast.Attribute) and isinstance(node.value, ast.Name)
+              and node.value.id in ("self", "cls")):
+            sibling = units_by_name.get(f"{unit.class_name}.{node.attr}")
+            if sibling is not None:
+                deps.append(sibling)
+    return deps
+
+
+class HotspotSlice:
+    """The excerpt sent to the model, and the spans its rewrites go back into."""
+
+    def __init__(self, source, hotspots, context, shares):
+        self.source = source
+        self.hotspots = hotspots
+        self.context = context
+        self.shares = shares
+        self.text = self._render()
+
+    def _segment(self, start, end, indent=0):
+        lines = self.source.splitlines()[start - 1:end]
+        return textwrap.dedent("\n".join(lines)) if indent else "\n".join(lines)
+
+    def _render(self):
+        parts = []
+        for unit in self.hotspots:
+            if unit.class_name:
+                where = f"method {unit.node.name} of class {unit.class_name}"
+            else:
+                where = f"function {unit.name}"
+            parts.append(f"# --- hotspot {where} (lines {unit.start}-{unit.end}),"
+                         f" {self.shares[unit.name]:.0%} of measured time ---")
+            parts.append(self._segment(unit.start, unit.end, unit.indent))
+        for label, start, end, indent in self.context:
+            parts.append(f"# --- context, do not rewrite: {label} (lines {start}-{end}) ---")
+            parts.append(self._segment(start, end, indent))
+        return "\n\n".join(parts)
+
+    @property
+    def line_count(self):
+        return self.text.count("\n") + 1
+
+    def _match(self, name, class_name=None):
+        if class_name:
+            return next((u for u in self.hotspots if u.name == f"{class_name}.{name}"), None)
+        exact = [u for u in self.hotspots if u.name == name]
+        if exact:
+            return exact[0]
+        methods = [u for u in self.hotspots if u.class_name and u.node.name == name]
+        return methods[0] if len(methods) == 1 else None
+
+    def splice(self, rewritten):
+        """The full source with rewritten hotspot functions put back in; None if nothing usable came back.
+
+        Methods may come back bare or inside their class; new imports are
+        added after the module's last top-level import.
+        """
+        try:
+            tree = ast.parse(rewritten)
+            original = ast.parse(self.source)
+        except SyntaxError:
+            return None
+        new_lines = rewritten.splitlines()
+
+        replacements = {}
+        imports = []
+        for node in tree.body:
+            candidates = []
+            if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+                candidates.append((node, self._match(node.name)))
+            elif isinstance(node, ast.ClassDef):
+                candidates.extend((child, self._match(child.name, node.name)) for child in node.body
+                                  if isinstance(child, (ast.FunctionDef, ast.AsyncFunctionDef)))
+            elif isinstance(node, (ast.Import, ast.ImportFrom)):
+                imports.append(ast.unparse(node))
+            for new, unit in candidates:
+                if unit is not None:
+                    start = min([new.lineno] + [d.lineno for d in new.decorator_list])
+                    body = textwrap.dedent("\n".join(new_lines[start - 1:new.end_lineno]))
+                    replacements[unit.name] = (unit, textwrap.indent(body, " " * unit.indent))
+        if not replacements:
+            return None
+
+        existing = {ast.unparse(node) for node in original.body if isinstance(node, (ast.Import, ast.ImportFrom))}
+        added = [line for line in dict.fromkeys(imports) if line not in existing]
+
+        edits = [(unit.start - 1, unit.end, text.splitlines()) for unit, text in replacements.values()]
+        if added:
+            import_nodes = [n for n in original.body if isinstance(n, (ast.Import, ast.ImportFrom))]
+            if import_nodes:
+                at = import_nodes[-1].end_lineno
+            elif original.body and isinstance(original.body[0], ast.Expr) and isinstance(
+                    getattr(original.body[0], "value", None), ast.Constant):
+                at = original.body[0].end_lineno  # after the module docstring
+            else:
+                at = 0
+            edits.append((at, at, added))
+
+        lines = self.source.splitlines()
+        for start, end, replacement in sorted(edits, key=lambda e: e[0], reverse=True):
+            lines[start:end] = replacement
+        result = "\n".join(lines) + "\n"
+        try:
+            ast.parse(result)
+        except SyntaxError:
+            return None
+        return result
+
+
+def slice_hotspots(source, filename, stats, top=DEFAULT_TOP, min_lines=SLICE_MIN_LINES):
+    """A HotspotSlice of the `top` functions of `source` by attributable time, or None.
+
+    `filename` is the name the script ran under, as it appears in the stats
+    keys. None means the whole file should be sent instead: it is shorter
+    than `min_lines`, doesn't parse, or no measured time falls in a function.
+    """
+    if source.count("\n") + 1 < min_lines:
+        return None
+    try:
+        tree = ast.parse(source)
+    except SyntaxError:
+        return None
+    units = find_units(tree)
+    by_name = {unit.name: unit for unit in units}
+
+    per_unit = {}
+    for key, seconds in attributable_time(stats, filename).items():
+        unit = unit_for_line(units, key[1], key[2])
+        if unit is not None:  # module-level code has no function to rewrite
+            per_unit[unit.name] = per_unit.get(unit.name, 0.0) + seconds
+    total = sum(per_unit.values())
+    if not total:
+        return None
+    ranked = sorted(per_unit, key=per_unit.get, reverse=True)[:top]
+    hotspots = sorted((by_name[name] for name in ranked), key=lambda u: u.start)
+    shares = {name: per_unit[name] / total for name in ranked}
+
+    definitions = module_definitions(tree)
+    context, seen = [], {u.start for u in hotspots}
+    for unit in hotspots:
+        for dep in direct_dependencies(unit, definitions, by_name):
+            if isinstance(dep, Unit):
+                label, start, end, indent = f"method {dep.name}", dep.start, dep.end, dep.indent
+            else:
+                start = min([dep.lineno] + [d.lineno for d in getattr(dep, "decorator_list", [])])
+                end = dep.end_lineno
+                if isinstance(dep, ast.ClassDef):
+                    end = dep.body[0].lineno - 1 if dep.body[0].lineno > dep.lineno else dep.lineno
+                if isinstance(dep, (ast.Import, ast.ImportFrom)):
+                    label = "import"
+                else:
+                    label = getattr(dep, "name", "module-level assignment")
+                indent = 0
+            end = min(end, start + MAX_CONTEXT_LINES - 1)
+            if start not in seen:
+                seen.add(start)
+                context.append((label, start, end, indent))
+    context.sort(key=lambda c: c[1])
+    return HotspotSlice(source, hotspots, context, shares)
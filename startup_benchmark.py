@@ -0,0 +1,113 @@
+"""Cold-start import benchmark: per-module import time of the dashboard, from `python -X importtime`.
+
+    python startup_benchmark.py                          # median of 5 fresh interpreters
+    python startup_benchmark.py --save startup.json      # record a baseline
+    python startup_benchmark.py --baseline startup.json  # exit 1 on a regression
+"""
+import argparse, json, os, statistics, subprocess, sys
+
+DEFAULT_MODULE = "ui"
+DEFAULT_RUNS = 5
+DEFAULT_TOLERANCE = 0.25  # fraction the total may grow over the baseline before it counts as a regression
+MIN_REGRESSION_MS = 20    # ignore growth smaller than this; single imports jitter by a few ms
+
+
+def parse_importtime(stderr):
+    """{module: (self µs, cumulative µs, depth)} from `-X importtime` output; depth 0 is a top-level import."""
+    modules = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        modules[name.strip()] = (int(self_us), int(cumulative_us), depth)
+    return modules
+
+
+def import_times(module=DEFAULT_MODULE, cwd=None, python=sys.executable):
+    """Import times of `module` and everything it pulls in, in a fresh interpreter.
+
+    The interpreter's own startup imports are left out: a module's line
+    comes after those of its imports, back to the previous top-level one.
+    """
+    cwd = cwd or os.path.dirname(os.path.abspath(__file__))
+    result = subprocess.run([python, "-X", "importtime", "-c", f"import {module}"], cwd=cwd,
+                            capture_output=True, text=True, check=True)
+    subtree = {}
+    for name, timing in parse_importtime(result.stderr).items():
+        if timing[2] == 0 and name != module:
+            subtree = {}
+        else:
+            subtree[name] = timing
+        if name == module:
+            break
+    return subtree
+
+
+def measure(module=DEFAULT_MODULE, runs=DEFAULT_RUNS, cwd=None, python=sys.executable):
+    """Median milliseconds over `runs` cold starts.
+
+    Returns {"module", "runs", "total", "modules": {name: (self ms,
+    cumulative ms, depth)}}.
+    """
+    samples = [import_times(module, cwd, python) for _ in range(runs)]
+    names = set.intersection(*(set(sample) for sample in samples))
+    modules = {}
+    for name in names:
+        self_ms = statistics.median(sample[name][0] for sample in samples) / 1000
+        cumulative_ms = statistics.median(sample[name][1] for sample in samples) / 1000
+        modules[name] = (self_ms, cumulative_ms, samples[0][name][2])
+    return {"module": module, "runs": runs, "total": modules[module][1], "modules": modules}
+
+
+def regressions(result, baseline, tolerance=DEFAULT_TOLERANCE, min_ms=MIN_REGRESSION_MS):
+    """(name, baseline ms, current ms) for the total and every module whose cumulative time grew too much."""
+    found = []
+    checks = [("total", baseline["total"], result["total"])]
+    for name, (_, cumulative, _) in result["modules"].items():
+        before = baseline["modules"].get(name)
+        checks.append((name, before[1] if before else 0.0, cumulative))
+    for name, before, after in checks:
+        if after - before > max(before * tolerance, min_ms):
+            found.append((name, before, after))
+    return found
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure the dashboard's cold-start import time per module.")
+    parser.add_argument("module", nargs="?", default=DEFAULT_MODULE, help="module to import (default: ui)")
+    parser.add_argument("-n", "--runs", type=int, default=DEFAULT_RUNS, help="fresh interpreters to take the median of")
+    parser.add_argument("--top", type=int, default=15, help="modules to list, slowest first")
+    parser.add_argument("--save", help="write the result to this JSON file as a baseline")
+    parser.add_argument("--baseline", help="compare with a saved baseline; exit 1 on a regression")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE,
+                        help="allowed growth over the baseline as a fraction (default: 0.25)")
+    parser.add_argument("--budget-ms", type=float, default=None, help="exit 1 if the total exceeds this")
+    args = parser.parse_args(argv)
+
+    result = measure(args.module, args.runs)
+    print(f"import {args.module}: {result['total']:.1f} ms (median of {args.runs})")
+    direct = [name for name, (_, _, depth) in result["modules"].items() if depth == 1]
+    direct.sort(key=lambda name: result["modules"][name][1], reverse=True)
+    for name in direct[:args.top] if args.top else direct:
+        print(f"  {result['modules'][name][1]:9.1f} ms  {name}")
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(result, f, indent=2, sort_keys=True)
+
+    failed = False
+    if args.budget_ms is not None and result["total"] > args.budget_ms:
+        print(f"over budget: {result['total']:.1f} ms > {args.budget_ms:.1f} ms", file=sys.stderr)
+        failed = True
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        for name, before, after in regressions(result, baseline, args.tolerance):
+            print(f"regression: {name} {before:.1f} ms -> {after:.1f} ms", file=sys.stderr)
+            failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,26 @@
+import json, socket
+
+from agent import decode_stats, encode_stats, parse_address
+
+STATS = {
+    ("app.py", 10, "handle"): (3, 3, 0.25, 1.5, {("app.py", 2, "serve"): (3, 3, 0.25, 1.5)}),
+    ("app.py", 2, "serve"): (1, 1, 0.0, 1.5, {}),
+}
+
+
+def test_stats_survive_the_wire_format():
+    # sampled stats have no recursion, so primitive calls always equal calls
+    assert decode_stats(json.loads(json.dumps(encode_stats(STATS)))) == STATS
+
+
+def test_empty_stats():
+    assert encode_stats({}) == []
+    assert decode_stats([]) == {}
+
+
+def test_parse_address():
+    assert parse_address("unix:/run/collector.sock") == (socket.AF_UNIX, "/run/collector.sock")
+    assert parse_address("/run/collector.sock") == (socket.AF_UNIX, "/run/collector.sock")
+    assert parse_address("10.0.0.5:8765") == (socket.AF_INET, ("10.0.0.5", 8765))
+    assert parse_address(":8765") == (socket.AF_INET, ("127.0.0.1", 8765))
+    assert parse_address("[::1]:8765") == (socket.AF_INET6, ("::1", 8765))
@@ -0,0 +1,73 @@
+import json, threading, time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from ai_client import AIClient, HttpBackend, backend_from_config
+
+REPLY = "The loop is the hotspot.\n```python\nprint(sum(range(10)))\n```\nsum() runs in C."
+
+
+class StubModel(BaseHTTPRequestHandler):
+    """Answers every prompt with REPLY, after `delay` seconds."""
+    delay = 0.0
+    prompts = []
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        type(self).prompts.append(body["prompt"])
+        time.sleep(self.delay)
+        payload = json.dumps({"text": REPLY}).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def stub_url():
+    StubModel.delay, StubModel.prompts = 0.0, []
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubModel)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_port}/generate"
+    server.shutdown()
+    server.server_close()
+
+
+def test_backend_from_config_prefers_url(stub_url):
+    backend = backend_from_config(url=stub_url, timeout=5.0)
+    assert isinstance(backend, HttpBackend)
+    assert backend.timeout == 5.0
+
+
+def test_optimize_through_stub_model_and_cache(stub_url):
+    client = AIClient(HttpBackend(stub_url), retries=0)
+    try:
+        code = "total = 0\nfor i in range(10):\n    total += i\nprint(total)\n"
+        optimized, content = client.optimize_sync(code, 1.0)
+        assert optimized == "print(sum(range(10)))"
+        assert content == REPLY
+        assert "for i in range(10)" in StubModel.prompts[0]
+
+        assert client.optimize_sync(code, 1.05) == (optimized, content)  # same energy bucket
+        assert len(StubModel.prompts) == 1
+    finally:
+        client.close()
+
+
+def test_slow_model_times_out(stub_url):
+    StubModel.delay = 1.0
+    backend = HttpBackend(stub_url, timeout=0.2)
+    client = AIClient(backend, timeout=5.0, retries=0)
+    try:
+        started = time.perf_counter()
+        with pytest.raises(OSError):  # the socket timeout, before the client's own limit
+            client.optimize_sync("print(1)\n", 1.0)
+        assert time.perf_counter() - started < 1.0
+    finally:
+        client.close()
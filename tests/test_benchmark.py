@@ -0,0 +1,45 @@
+import pytest
+
+from benchmark import bootstrap_ci, compare, percentile
+
+
+def test_percentile_interpolates_between_ranks():
+    assert percentile([4, 1, 3, 2], 50) == 2.5
+    assert percentile([1, 2, 3, 4, 5], 95) == pytest.approx(4.8)
+    assert percentile([7], 95) == 7
+    with pytest.raises(ValueError):
+        percentile([], 50)
+
+
+def test_bootstrap_ci_brackets_the_median():
+    low, high = bootstrap_ci([10.0, 10.5, 9.5, 10.2, 9.8, 10.1])
+
+    assert 9.5 <= low <= 10.05 <= high <= 10.5
+
+
+def test_compare_finds_a_clear_improvement():
+    before = [10.0, 10.2, 9.9, 10.1, 10.3, 9.8, 10.0, 10.1]
+    after = [8.0, 8.1, 7.9, 8.2, 8.0, 7.8, 8.1, 8.0]
+
+    result = compare(before, after)
+
+    assert result["delta"] == pytest.approx(8.0 - 10.05)
+    assert result["pct"] == pytest.approx((8.0 - 10.05) / 10.05 * 100)
+    assert result["ci_high"] < 0
+    assert result["significant"]
+
+
+def test_compare_calls_overlapping_runs_insignificant():
+    before = [10.0, 12.0, 9.0, 11.0, 10.5, 9.5]
+    after = [10.2, 11.5, 9.2, 10.8, 10.4, 9.9]
+
+    result = compare(before, after)
+
+    assert result["ci_low"] < 0 < result["ci_high"]
+    assert not result["significant"]
+
+
+def test_compare_is_reproducible_with_a_seed():
+    before, after = [1.0, 1.2, 0.9, 1.1], [1.05, 1.1, 0.95, 1.0]
+
+    assert compare(before, after, seed=3) == compare(before, after, seed=3)
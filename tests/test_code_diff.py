@@ -0,0 +1,63 @@
+from code_diff import diff_functions, remap_stats, same_program, syntax_error
+
+BEFORE = """\
+def helper(x):
+    return x * 2
+
+
+def main():
+    return helper(21)
+
+
+print(main())
+"""
+
+
+def test_same_program_ignores_comments_and_formatting():
+    reformatted = "# doubles\ndef helper( x ):\n    return x*2\n\ndef main():\n    return helper(21)  # the answer\nprint(main())\n"
+
+    assert same_program(BEFORE, reformatted)
+    assert not same_program(BEFORE, BEFORE.replace("x * 2", "x * 3"))
+    assert not same_program(BEFORE, "def main(:\n")
+
+
+def test_syntax_error_names_the_line():
+    assert syntax_error(BEFORE) is None
+    assert syntax_error("x = 1\ndef main(:\n").startswith("line 2:")
+
+
+def test_diff_functions():
+    after = BEFORE.replace("x * 2", "x + x").replace("print(main())", "def extra():\n    pass\n\nprint(main(), 1)")
+
+    assert diff_functions(BEFORE, after) == {
+        "changed": ["helper"],
+        "added": ["extra"],
+        "removed": [],
+        "unchanged": ["main"],
+        "module": True,
+    }
+    assert diff_functions(BEFORE, "def main(:\n") is None
+
+
+def test_diff_functions_names_methods_and_nested_functions():
+    before = "class A:\n    def run(self):\n        def inner():\n            return 1\n        return inner()\n"
+    after = before.replace("return 1", "return 2")
+
+    diff = diff_functions(before, after)
+
+    assert diff["changed"] == ["A.run", "A.run.inner"]
+    assert not diff["module"]
+
+
+def test_remap_stats_follows_functions_to_their_new_lines():
+    after = "# a comment\n\n" + BEFORE
+    stats = {
+        ("s.py", 1, "helper"): (1, 1, 0.5, 0.5, {("s.py", 5, "main"): (1, 1, 0.5, 0.5)}),
+        ("s.py", 5, "main"): (1, 1, 0.1, 0.6, {}),
+        ("~", 0, "<built-in method builtins.print>"): (1, 1, 0.0, 0.0, {}),
+    }
+
+    remapped = remap_stats(stats, "s.py", BEFORE, after)
+
+    assert set(remapped) == {("s.py", 3, "helper"), ("s.py", 7, "main"), ("~", 0, "<built-in method builtins.print>")}
+    assert remapped[("s.py", 3, "helper")][4] == {("s.py", 7, "main"): (1, 1, 0.5, 0.5)}
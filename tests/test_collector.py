@@ -0,0 +1,50 @@
+from collector import ACTIVE_SECONDS, BUCKET_SECONDS, ServiceTotals
+
+KEY = ("app.py", 10, "handle")
+
+
+def delta(pid, cpu, host="web-1"):
+    message = {"type": "delta", "service": "api", "host": host, "pid": pid, "cpu": cpu, "agent": cpu / 100,
+               "samples": 10, "dropped": 1, "clock": "thread"}
+    return message, {KEY: (10, 10, cpu, cpu, {})}
+
+
+def test_add_merges_stats_and_totals():
+    totals = ServiceTotals(now=0.0)
+
+    totals.add(*delta(1, 2.0), now=5.0)
+    totals.add(*delta(2, 3.0), now=6.0)
+
+    assert totals.stats == {KEY: (20, 20, 5.0, 5.0, {})}
+    assert (totals.cpu, totals.samples, totals.dropped, totals.last_seen) == (5.0, 20, 2, 6.0)
+    assert sorted(totals.processes) == ["web-1:1", "web-1:2"]
+    assert totals.processes["web-1:1"]["cpu"] == 2.0
+
+
+def test_add_buckets_cpu_per_minute():
+    totals = ServiceTotals(now=0.0)
+
+    totals.add(*delta(1, 1.0), now=10.0)
+    totals.add(*delta(1, 2.0), now=BUCKET_SECONDS - 1)
+    totals.add(*delta(1, 4.0), now=BUCKET_SECONDS + 1)
+
+    assert list(totals.buckets) == [[0.0, 3.0], [BUCKET_SECONDS, 4.0]]
+
+
+def test_add_forgets_processes_that_went_quiet():
+    totals = ServiceTotals(now=0.0)
+    totals.add(*delta(1, 1.0), now=0.0)
+
+    totals.add(*delta(2, 1.0), now=ACTIVE_SECONDS)
+
+    assert list(totals.processes) == ["web-1:2"]
+    assert totals.summary(now=ACTIVE_SECONDS)["active"] == 1
+    assert totals.cpu == 2.0  # the restarted worker's CPU time still counts toward the service
+
+
+def test_summary_lists_functions_on_request():
+    totals = ServiceTotals(now=0.0)
+    totals.add(*delta(1, 1.0), now=1.0)
+
+    assert "functions" not in totals.summary(now=1.0)
+    assert totals.summary(now=1.0, functions=True)["functions"] == [["app.py", 10, "handle", 10, 1.0, 1.0, []]]
@@ -0,0 +1,65 @@
+import pytest
+
+from energy import idle_energy, process_share, run_energy
+
+
+def make_report(self_times, watts=30, source="estimate", idle_joules=0.0, dram_joules=None):
+    # stats values are pstats tuples: (primitive calls, calls, self time, cumulative time, callers)
+    report = {
+        "stats": {("script.py", line, f"f{line}"): (1, 1, t, t, {}) for line, t in enumerate(self_times, 1)},
+        "energy": {"watts": watts, "source": source, "idle_joules": idle_joules},
+    }
+    if dram_joules is not None:
+        report["memory"] = {"dram_joules": dram_joules}
+    return report
+
+
+def test_idle_energy_charges_only_time_off_the_cpu():
+    assert idle_energy(3.0, 1.0) == 2.0
+    assert idle_energy(3.0, 1.0, idle_watts=5) == 10.0
+    assert idle_energy(1.0, 1.5) == 0.0  # more CPU than wall time, from several threads
+
+
+def test_process_share_of_a_quiet_host():
+    # the only busy process on a 4-CPU host, one CPU busy for the whole run
+    joules = process_share(50.0, wall_time=2.0, cpu_time=2.0, host_cpu_time=2.0, baseline_watts=10, cpus=4)
+
+    assert joules == pytest.approx(30.0 + 20.0 * 0.25)
+
+
+def test_process_share_splits_dynamic_power_by_cpu_time():
+    # a concurrent job used three times the CPU, so it is billed for three quarters of the excess
+    joules = process_share(50.0, wall_time=2.0, cpu_time=1.0, host_cpu_time=4.0, baseline_watts=10, cpus=4)
+
+    assert joules == pytest.approx(30.0 * 0.25 + 20.0 * 0.125)
+
+
+def test_process_share_of_an_idle_process():
+    assert process_share(50.0, wall_time=2.0, cpu_time=0.0, host_cpu_time=4.0, baseline_watts=10, cpus=4) == 0.0
+
+
+def test_process_share_with_a_reading_below_baseline():
+    # a noisy measurement below the baseline draw caps the baseline instead of going negative
+    joules = process_share(5.0, wall_time=2.0, cpu_time=2.0, host_cpu_time=2.0, baseline_watts=10, cpus=1)
+
+    assert joules == pytest.approx(5.0)
+    assert process_share(-1.0, wall_time=2.0, cpu_time=2.0, host_cpu_time=2.0, baseline_watts=10, cpus=1) == 0.0
+
+
+def test_run_energy_adds_cpu_idle_and_dram():
+    report = make_report([0.5, 1.5], watts=20, idle_joules=3.0, dram_joules=0.25)
+
+    assert run_energy(report) == pytest.approx(2.0 * 20 + 3.0 + 0.25)
+
+
+def test_run_energy_leaves_dram_out_of_rapl_measurements():
+    report = make_report([1.0], watts=20, source="rapl", dram_joules=0.25)
+
+    assert run_energy(report) == pytest.approx(20.0)
+
+
+def test_run_energy_of_a_benchmark_is_the_median_run():
+    report = make_report([1.0])
+    report["benchmark"] = {"energies": [5.0, 1.0, 3.0]}
+
+    assert run_energy(report) == 3.0
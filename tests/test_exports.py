@@ -0,0 +1,61 @@
+import csv, io, json
+
+import pytest
+
+from exports import COLUMNS, available_formats, export_bytes
+from profile_frame import ProfileFrame
+
+STATS = {
+    ("/src/app.py", 10, "parse"): (4, 5, 0.5, 1.5, {}),
+    ('/src/odd, "quoted".py', 3, "<lambda>"): (1, 1, 2.0, 2.0, {}),
+    ("~", 0, "<built-in method builtins.len>"): (9, 9, 0.25, 0.25, {}),
+}
+
+
+def expected_rows():
+    rows = [(file, line, name, cc, nc, tt, ct, tt * 30, ct * 30) for (file, line, name), (cc, nc, tt, ct, _) in STATS.items()]
+    return sorted(rows, key=lambda row: row[7], reverse=True)
+
+
+def test_csv_round_trip_quotes_awkward_file_names():
+    data = export_bytes(ProfileFrame.from_stats(STATS, watts=30), "CSV", chunk_rows=2)
+
+    header, *rows = csv.reader(io.StringIO(data.decode("utf-8")))
+
+    assert header == COLUMNS
+    assert rows == [[str(value) for value in row] for row in expected_rows()]
+
+
+def test_jsonl_round_trip():
+    data = export_bytes(ProfileFrame.from_stats(STATS, watts=30), "JSON Lines", chunk_rows=2)
+
+    records = [json.loads(line) for line in data.decode("utf-8").splitlines()]
+
+    assert [tuple(record[column] for column in COLUMNS) for record in records] == expected_rows()
+
+
+@pytest.mark.parametrize("fmt", ["Parquet", "Arrow IPC"])
+def test_arrow_round_trip(fmt):
+    pa = pytest.importorskip("pyarrow")
+    if fmt not in available_formats():
+        pytest.skip(f"{fmt} export is unavailable")
+    data = export_bytes(ProfileFrame.from_stats(STATS, watts=30), fmt, chunk_rows=2)
+
+    if fmt == "Parquet":
+        import pyarrow.parquet as pq
+        table = pq.read_table(pa.BufferReader(data))
+    else:
+        table = pa.ipc.open_file(pa.BufferReader(data)).read_all()
+
+    assert table.column_names == COLUMNS
+    assert [tuple(row[column] for column in COLUMNS) for row in table.to_pylist()] == expected_rows()
+
+
+def test_empty_frame_exports_a_header_only():
+    assert export_bytes(ProfileFrame.from_stats({}), "CSV").decode("utf-8").splitlines() == [",".join(COLUMNS)]
+    assert export_bytes(ProfileFrame.from_stats({}), "JSON Lines") == b""
+
+
+def test_unknown_format():
+    with pytest.raises(ValueError):
+        export_bytes(ProfileFrame.from_stats(STATS), "XML")
@@ -0,0 +1,74 @@
+import cProfile, io, marshal, pstats, zipfile
+
+import pytest
+
+from prof_ingest import ProfileImportError, load_stats, merge_into, read_upload
+
+
+def fib(n):
+    return n if n < 2 else fib(n - 1) + fib(n - 2)
+
+
+def run(n):
+    profiler = cProfile.Profile()
+    profiler.runcall(fib, n)
+    profiler.create_stats()
+    return profiler
+
+
+def profile(n):
+    return run(n).stats
+
+
+def copy(stats):
+    return marshal.loads(marshal.dumps(stats))
+
+
+def test_merge_into_matches_pstats_add():
+    first, second = run(10), run(12)
+
+    merged = merge_into(merge_into({}, copy(first.stats)), copy(second.stats))
+
+    assert merged == pstats.Stats(first).add(second).stats
+
+
+def test_merge_into_leaves_its_inputs_alone():
+    first, second = profile(5), profile(6)
+    snapshot = marshal.dumps(first), marshal.dumps(second)
+
+    merge_into(merge_into({}, first), second)
+
+    assert (marshal.dumps(first), marshal.dumps(second)) == snapshot
+
+
+def test_merge_into_adds_call_counts_of_the_pure_python_profiler():
+    key, caller = ("a.py", 1, "f"), ("a.py", 9, "main")
+    target = {key: (1, 1, 0.5, 0.5, {caller: 1})}
+
+    merge_into(target, {key: (2, 2, 0.25, 0.25, {caller: 2})})
+
+    assert target == {key: (3, 3, 0.75, 0.75, {caller: 3})}
+
+
+def test_load_stats_rejects_other_data():
+    stats = profile(3)
+    assert load_stats(marshal.dumps(stats)) == stats
+    with pytest.raises(ProfileImportError):
+        load_stats(b"not marshalled")
+    with pytest.raises(ProfileImportError):
+        load_stats(marshal.dumps({"a": 1}))
+
+
+def test_read_upload_picks_dumps_out_of_an_archive():
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as archive:
+        archive.writestr("run1.prof", b"one")
+        archive.writestr("logs/run.log", b"skipped")
+        archive.writestr("nested/run2.pstats", b"two")
+
+    dumps = read_upload("runs.zip", buffer.getvalue())
+
+    assert dumps == [("runs.zip/run1.prof", b"one"), ("runs.zip/nested/run2.pstats", b"two")]
+    assert read_upload("anything.bin", b"raw") == [("anything.bin", b"raw")]
+    with pytest.raises(ProfileImportError):
+        read_upload("broken.zip", b"not a zip")
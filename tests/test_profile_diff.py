@@ -0,0 +1,49 @@
+import pytest
+
+from profile_diff import ProfileDiff, align
+
+
+def stats_for(calls_and_times):
+    return {key: (calls, calls, seconds, seconds, {}) for key, (calls, seconds) in calls_and_times.items()}
+
+
+def test_align_pairs_exact_keys():
+    before = {("a.py", 1, "f"): None, ("a.py", 9, "g"): None}
+
+    assert sorted(align(before, dict(before))) == sorted((key, key) for key in before)
+
+
+def test_align_follows_a_function_whose_line_or_path_moved():
+    before = {("/old/a.py", 10, "f"): None}
+    after = {("/new/a.py", 14, "f"): None}
+
+    assert align(before, after) == [(("/old/a.py", 10, "f"), ("/new/a.py", 14, "f"))]
+
+
+def test_align_pairs_same_named_functions_by_nearest_line():
+    before = {("a.py", 10, "run"): None, ("a.py", 50, "run"): None}
+    after = {("a.py", 52, "run"): None, ("a.py", 12, "run"): None, ("a.py", 90, "run"): None}
+
+    assert sorted(align(before, after), key=str) == sorted([
+        (("a.py", 10, "run"), ("a.py", 12, "run")),
+        (("a.py", 50, "run"), ("a.py", 52, "run")),
+        (None, ("a.py", 90, "run")),
+    ], key=str)
+
+
+def test_align_reports_added_and_removed_functions():
+    pairs = align({("a.py", 1, "old"): None}, {("a.py", 1, "new"): None})
+
+    assert sorted(pairs, key=str) == sorted([(("a.py", 1, "old"), None), (None, ("a.py", 1, "new"))], key=str)
+
+
+def test_profile_diff_compares_joules_at_each_runs_watts():
+    before = stats_for({("a.py", 1, "f"): (10, 1.0), ("a.py", 5, "gone"): (1, 0.5)})
+    after = stats_for({("a.py", 3, "f"): (10, 1.0), ("a.py", 9, "new"): (2, 0.25)})
+
+    diff = ProfileDiff(before, after, watts_before=30, watts_after=20)
+
+    assert [ProfileDiff.key(row) for row in diff.wins()] == [("a.py", 5, "gone"), ("a.py", 3, "f")]
+    assert [ProfileDiff.key(row) for row in diff.regressions()] == [("a.py", 9, "new")]
+    assert [row[:2] for row in diff.moved()] == [(("a.py", 1, "f"), ("a.py", 3, "f"))]
+    assert diff.total_delta() == pytest.approx(20 * 1.25 - 30 * 1.5)
@@ -0,0 +1,52 @@
+from rapl import RaplMeter, counter_delta, discover_domains, total_joules
+
+
+def make_zone(root, entry, name, energy_uj, max_range_uj=262143328850):
+    zone = root / entry
+    zone.mkdir()
+    (zone / "name").write_text(f"{name}\n")
+    (zone / "energy_uj").write_text(f"{energy_uj}\n")
+    (zone / "max_energy_range_uj").write_text(f"{max_range_uj}\n")
+    return zone
+
+
+def test_discover_domains_labels_subdomains_by_package(tmp_path):
+    make_zone(tmp_path, "intel-rapl:0", "package-0", 1000)
+    make_zone(tmp_path, "intel-rapl:0:0", "core", 500)
+    make_zone(tmp_path, "intel-rapl:0:1", "dram", 200)
+    make_zone(tmp_path, "intel-rapl:1", "package-1", 3000)
+    (tmp_path / "intel-rapl-mmio:0").mkdir()
+
+    labels = sorted(domain.label for domain in discover_domains(str(tmp_path)))
+
+    assert labels == ["package-0", "package-0/core", "package-0/dram", "package-1"]
+
+
+def test_discover_domains_skips_unreadable_zones(tmp_path):
+    make_zone(tmp_path, "intel-rapl:0", "package-0", 1000)
+    (make_zone(tmp_path, "intel-rapl:1", "package-1", 1000) / "energy_uj").unlink()
+
+    assert [domain.label for domain in discover_domains(str(tmp_path))] == ["package-0"]
+
+
+def test_discover_domains_without_powercap(tmp_path):
+    assert discover_domains(str(tmp_path / "missing")) == []
+
+
+def test_counter_delta():
+    assert counter_delta(100, 350, 1000) == 250
+    assert counter_delta(900, 150, 1000) == 250  # wrapped past max_energy_range_uj
+    assert counter_delta(500, 500, 1000) == 0
+
+
+def test_meter_accumulates_across_a_wraparound(tmp_path):
+    zone = make_zone(tmp_path, "intel-rapl:0", "package-0", 900_000, max_range_uj=1_000_000)
+    meter = RaplMeter(str(tmp_path), poll_interval=None).start()
+    (zone / "energy_uj").write_text("100000\n")
+    meter.poll()
+    (zone / "energy_uj").write_text("600000\n")
+
+    joules = meter.stop()
+
+    assert joules == {"package-0": 0.7}
+    assert total_joules(joules) == 0.7
@@ -0,0 +1,93 @@
+import textwrap
+
+from slicer import slice_hotspots
+
+SOURCE = textwrap.dedent('''\
+    """A script with one hot function and one cold one."""
+    import math
+
+    SCALE = 3
+
+
+    def cold(x):
+        return x + 1
+
+
+    def hot(n):
+        total = 0
+        for i in range(n):
+            total += math.sqrt(i) * SCALE
+        return total
+
+
+    class Shape:
+        def area(self):
+            return self.side ** 2
+
+        def slow_area(self):
+            return sum(self.side for _ in range(self.side))
+
+
+    print(hot(10), cold(1))
+''')
+
+
+def stats_for(seconds):
+    # (primitive calls, calls, self time, cumulative time, callers), keyed like pstats
+    return {("script.py", line, name): (1, 1, t, t, {}) for (line, name), t in seconds.items()}
+
+
+def make_slice(seconds):
+    return slice_hotspots(SOURCE, "script.py", stats_for(seconds), top=2, min_lines=1)
+
+
+def test_slice_holds_hotspots_and_their_context():
+    hotspots = make_slice({(11, "hot"): 0.9, (7, "cold"): 0.1, (1, "<module>"): 5.0})
+
+    assert [unit.name for unit in hotspots.hotspots] == ["cold", "hot"]
+    assert hotspots.shares == {"hot": 0.9, "cold": 0.1}
+    assert "def hot(n):" in hotspots.text
+    assert "context, do not rewrite: import" in hotspots.text
+    assert "context, do not rewrite: module-level assignment" in hotspots.text
+    assert "print(" not in hotspots.text
+
+
+def test_short_scripts_are_not_sliced():
+    assert slice_hotspots(SOURCE, "script.py", stats_for({(11, "hot"): 1.0})) is None
+
+
+def test_splice_replaces_only_the_rewritten_function():
+    hotspots = make_slice({(11, "hot"): 0.9, (7, "cold"): 0.1})
+
+    spliced = hotspots.splice(textwrap.dedent('''\
+        def hot(n):
+            return SCALE * sum(math.sqrt(i) for i in range(n))
+    '''))
+
+    assert "return SCALE * sum(math.sqrt(i) for i in range(n))" in spliced
+    assert "total += math.sqrt(i) * SCALE" not in spliced
+    assert "def cold(x):\n    return x + 1" in spliced
+    assert spliced.endswith("print(hot(10), cold(1))\n")
+
+
+def test_splice_puts_a_bare_method_back_in_its_class_and_adds_new_imports():
+    hotspots = make_slice({(22, "slow_area"): 1.0})
+
+    spliced = hotspots.splice(textwrap.dedent('''\
+        import operator
+
+        def slow_area(self):
+            return operator.mul(self.side, self.side)
+    '''))
+
+    lines = spliced.splitlines()
+    assert lines[1:3] == ["import math", "import operator"]
+    assert "    def slow_area(self):\n        return operator.mul(self.side, self.side)" in spliced
+    assert "    def area(self):\n        return self.side ** 2" in spliced
+
+
+def test_splice_rejects_unusable_rewrites():
+    hotspots = make_slice({(11, "hot"): 1.0})
+
+    assert hotspots.splice("def hot(n:\n    pass") is None  # doesn't parse
+    assert hotspots.splice("def unrelated():\n    pass") is None  # no hotspot came back
@@ -1,9 +1,27 @@
+import hashlib
+import marshal
+import os
+import secrets
+import sqlite3
+import time
 import streamlit as st
-import plotly.express as px
-import plotly.graph_objects as go
-import pandas as pd
-from profiler import run_profiler, get_ai_optimization
-from energy import estimate_energy
+# plotly, pandas, numpy and the profiler/benchmark/export modules take most of a cold start and
+# aren't needed to draw the upload page, so they're imported by the functions that use them.
+from energy import calculate_grade, run_energy, CPU_POWER_WATTS, DRAM_WATTS_PER_GB, IDLE_POWER_WATTS
+from worker_pool import ProfilerPool, JobTimeoutError, JobError
+from result_cache import ResultCache, cache_key
+from callgraph import CallGraph, format_key
+from history import RunHistory
+from power_model import load_profiles
+from ai_client import AIClient, AIConfigError, backend_from_config
+from slicer import slice_hotspots
+from code_diff import diff_functions, remap_stats, same_program, syntax_error
+
+LIVE_SCRIPT_NAME = "live_editor.py"
+LIVE_DEBOUNCE = 0.75  # seconds without edits before the live editor re-profiles
+LIVE_PLACEHOLDER = "# Enter Python code\nprint('Hello')"
+PRODUCTION_REFRESH = 5  # seconds between reads of the production collector
+PRODUCTION_MAX_BACKOFF = 60  # longest wait before trying an unreachable collector again
 
 def get_theme_css(dark_mode=True):
     """Returns the appropriate CSS based on theme selection."""
@@ -277,6 +295,20 @@ def display_header():
     </div>
     ''', unsafe_allow_html=True)
 
+def session_script_path(name):
+    """The synthetic filename this session's script is compiled and profiled under.
+
+    Code travels to the workers as text, so concurrent sessions can't
+    overwrite each other's scripts; the session id keeps their names apart
+    in tracebacks and profiles. The script's `__file__` is this name, and
+    spawned children get a private temporary copy (see
+    concurrent_profiler.spawnable_main), so files opened relative to the
+    script's directory aren't found.
+    """
+    if "session_id" not in st.session_state:
+        st.session_state.session_id = secrets.token_hex(4)
+    return f"<session {st.session_state.session_id}>/{os.path.basename(name)}"
+
 def handle_file_upload():
     st.markdown('''
     <div class="section-header">
@@ -294,31 +326,158 @@ def handle_file_upload():
     )
     
     if uploaded_file:
-        path = "temp.py"
+        path = session_script_path(uploaded_file.name)
         code = uploaded_file.read().decode("utf-8")
-        with open(path, "w") as f:
-            f.write(code)
+        st.session_state.script_name = uploaded_file.name
         st.success(f"✓ {uploaded_file.name} uploaded successfully")
         return path, code
     return None, None
 
-def run_analysis(path):
+def handle_profile_import():
+    """A report of uploaded cProfile dumps merged together, or None; merged once per set of files."""
+    uploads = st.file_uploader(
+        "…or import cProfile dumps",
+        type=["prof", "pstats", "profile", "zip", "tar", "gz", "tgz", "bz2", "xz"],
+        accept_multiple_files=True,
+        key="profile_import",
+        help="One or many .prof files collected from production, or a zip/tar archive of them. "
+             "Nothing is executed; the profiles are merged and analysed as recorded."
+    )
+    if not uploads:
+        return None
+    from prof_ingest import ProfileImportError, import_report, merge_in_pool, profile_name, read_upload
+    files = [(upload.name, upload.getvalue()) for upload in uploads]
+    digest = hashlib.sha256()
+    for name, data in files:
+        digest.update(hashlib.sha256(data).digest())
+    key = cache_key(digest.digest(), {"import": [name for name, _ in files]})
+    report = get_result_cache().get(key)
+    if report is not None:
+        return report
+
+    try:
+        dumps = [dump for name, data in files for dump in read_upload(name, data)]
+        with st.spinner(f"Merging {len(dumps)} profiles..."):
+            stats, skipped = merge_in_pool(get_profiler_pool(), dumps)
+    except ProfileImportError as e:
+        st.error(f"Could not import the profiles: {e}")
+        return None
+    except (JobTimeoutError, JobError) as e:
+        st.error(f"Merging the profiles failed: {str(e).splitlines()[-1]}")
+        return None
+    report = import_report(profile_name([name for name, _ in files]), stats, len(dumps) - len(skipped), skipped)
+    get_result_cache().put(key, report)
+    return report
+
+@st.cache_resource
+def get_profiler_pool():
+    """One pool of profiling workers shared by every session on this server."""
+    return ProfilerPool()
+
+@st.cache_resource
+def get_result_cache():
+    """Profiling results shared by every session and, through the disk tier, across restarts."""
+    return ResultCache()
+
+@st.cache_resource
+def get_run_history():
+    """The local SQLite run history, shared by every session."""
+    return RunHistory()
+
+@st.cache_resource
+def get_shared_ai_client():
+    """One AI client, with its response cache, shared by every session.
+
+    Raises AIConfigError when no backend is configured; exceptions aren't
+    cached, so a key added later is picked up on the next call.
+    """
+    try:
+        api_key = st.secrets.get("GEMINI_API_KEY")
+    except Exception:  # no secrets.toml: fall back to the environment
+        api_key = None
+    return AIClient(backend_from_config(api_key))
+
+def get_ai_client():
+    """The shared AI client; None if no backend is configured."""
+    try:
+        return get_shared_ai_client()
+    except AIConfigError:
+        return None
+
+def get_profiler_settings():
+    """Settings that change what the profiler measures; they are part of every cache key."""
+    settings = {
+        "profiler": st.session_state.get("profiler_mode", "cprofile"),
+        "sample_interval": st.session_state.get("sample_interval_ms", 100) / 1000,
+        "machine": st.session_state.get("machine_profile") or load_profiles()[0],
+        "clock": st.session_state.get("profiler_clock", "cpu"),
+    }
+    if st.session_state.get("idle_watts") is not None:
+        settings["idle_watts"] = st.session_state.idle_watts
+    if settings["profiler"] == "sampling":
+        settings["sample_rate"] = st.session_state.get("sample_rate_hz", 200)
+    if st.session_state.get("line_profile"):
+        settings["line_profile"] = True
+    if st.session_state.get("memory_profile"):
+        settings["memory_profile"] = True
+    if st.session_state.get("benchmark_mode"):
+        settings["benchmark_runs"] = st.session_state.get("benchmark_runs", 10)
+        settings["benchmark_warmup"] = st.session_state.get("benchmark_warmup", 2)
+    return settings
+
+def profile_script(path, code, script_name="script.py"):
+    """Profiles a script in the worker pool, reusing the cached report when the code is unchanged.
+
+    Every fresh (uncached) run is also recorded in the run history under `script_name`.
+
+    Returns the report dict from `profiler.profile_job`, or None (after showing
+    an error) if the job fails.
+    """
+    from benchmark import run_benchmark_in_pool
+    from profiler import run_profiler_in_pool
+    settings = get_profiler_settings()
+    key = cache_key(code, settings)
+    cache = get_result_cache()
+    report = cache.get(key)
+    if report is not None:
+        return report
+
+    try:
+        if "benchmark_runs" in settings:
+            report = run_benchmark_in_pool(get_profiler_pool(), path, settings, code)
+        else:
+            report = run_profiler_in_pool(get_profiler_pool(), path, settings, code)
+    except JobTimeoutError as e:
+        st.error(f"Profiling stopped: {e}")
+        return None
+    except JobError as e:
+        st.error("Your script raised an error while being profiled.")
+        st.code(str(e), language="text")
+        return None
+
+    store_report(key, code, settings, report, script_name)
+    return report
+
+def store_report(key, code, settings, report, script_name):
+    """Caches a fresh report and records it in the run history."""
+    get_result_cache().put(key, report)
+    try:
+        get_run_history().record_run(script_name, code, settings, report)
+    except sqlite3.Error as e:
+        st.warning(f"Run not saved to history: {e}")
+
+def run_analysis(path, code, script_name="script.py"):
+    cached = get_result_cache().get(cache_key(code, get_profiler_settings()))
+    if cached is not None:
+        return cached
+
     progress = st.progress(0, text="Initializing...")
     progress.progress(30, text="Running profiler...")
-    stats = run_profiler(path)
+    report = profile_script(path, code, script_name)
     progress.progress(70, text="Calculating metrics...")
     progress.progress(100, text="Complete")
     progress.empty()
-    return stats
-
-def calculate_grade(total_energy):
-    """Calculates a sustainability grade (A-E) based on total energy consumption with botanical colors."""
-    if total_energy < 0.1: return "A+", "#059669"
-    if total_energy < 0.5: return "A", "#10b981"
-    if total_energy < 2.0: return "B", "#34d399"
-    if total_energy < 5.0: return "C", "#d97706" # Amber for contrast
-    if total_energy < 10.0: return "D", "#dc2626"
-    return "E", "#991b1b"
+    return report
 
 def display_sustainability_score(total_energy):
     grade, color = calculate_grade(total_energy)
@@ -331,14 +490,26 @@ def display_sustainability_score(total_energy):
     </div>
     ''', unsafe_allow_html=True)
 
-def process_data(stats):
-    functions = []
-    energies = []
-    for func, data in list(stats.items())[:10]:
-        cpu_time = data[3]
-        functions.append(str(func))
-        energies.append(estimate_energy(cpu_time))
-    total_energy = sum(energies)
+def get_profile_frame(report, slot="profile_frame"):
+    """The run's ProfileFrame, built once per report and reused on every rerun."""
+    from profile_frame import ProfileFrame
+    cached = st.session_state.get(slot)
+    if cached is not None and cached[0] is report:
+        return cached[1]
+    if report:
+        frame = ProfileFrame.from_stats(report["stats"], report["energy"]["watts"])
+    else:
+        frame = ProfileFrame.from_stats({})
+    st.session_state[slot] = (report, frame)
+    return frame
+
+def process_data(frame):
+    """Top 10 functions by exclusive (self) energy, and the run's total from all self times."""
+    from profile_frame import ProfileFrame
+    top = frame.top(10)
+    functions = ProfileFrame.labels(top)
+    energies = top["self_energy"].tolist()
+    total_energy = frame.total_energy
     return functions, energies, total_energy
 
 def display_energy_metrics(total_energy):
@@ -365,11 +536,23 @@ def display_energy_metrics(total_energy):
     </div>
     ''', unsafe_allow_html=True)
 
-def display_energy_reduction(total_energy):
+def display_energy_reduction(total_energy, samples=None):
+    """Compares with the previous analysis; with benchmark samples on both sides, tests significance."""
+    from benchmark import compare
     if "previous_energy" not in st.session_state:
         st.session_state.previous_energy = None
+    previous_samples = st.session_state.get("previous_samples")
 
-    if st.session_state.previous_energy:
+    if samples and previous_samples:
+        result = compare(previous_samples, samples)
+        interval = f"95% CI {result['ci_low']:+.4f} to {result['ci_high']:+.4f} J"
+        if not result["significant"]:
+            st.info(f"→ No significant change in median energy ({result['pct']:+.2f}%, {interval})")
+        elif result["delta"] < 0:
+            st.success(f"↓ Median energy reduced by {abs(result['pct']):.2f}% ({interval})")
+        else:
+            st.warning(f"↑ Median energy increased by {result['pct']:.2f}% ({interval})")
+    elif st.session_state.previous_energy:
         reduction = ((st.session_state.previous_energy - total_energy) / st.session_state.previous_energy) * 100
         if reduction > 0:
             st.success(f"↓ Energy reduced by {reduction:.2f}%")
@@ -379,8 +562,94 @@ def display_energy_reduction(total_energy):
             st.info("→ Energy unchanged")
 
     st.session_state.previous_energy = total_energy
+    st.session_state.previous_samples = samples
+
+def previous_report(report):
+    """The report analysed before this one in the session, for the per-function diff; None if there wasn't one.
 
-def display_chart(functions, energies):
+    Reports are told apart by a cheap fingerprint, not identity: the
+    cache's disk tier hands back a new copy of the same run on each rerun.
+    """
+    if not report:
+        return None
+    token = (report.get("script"), report["wall_time"], report["cpu_time"], len(report["stats"]))
+    current = st.session_state.get("diff_current")
+    if current is None or current[0] != token:
+        st.session_state.diff_previous = current[1] if current else None
+        st.session_state.diff_current = (token, report)
+    return st.session_state.get("diff_previous")
+
+def display_profile_diff(previous, report, top=10):
+    """Which functions' energy changed most since the previous analysis, as a diverging bar chart."""
+    if not previous or not report:
+        return
+    import plotly.graph_objects as go
+    from profile_diff import ProfileDiff
+    cached = st.session_state.get("profile_diff")
+    if cached is not None and cached[0] is previous and cached[1] is report:
+        diff = cached[2]
+    else:
+        diff = ProfileDiff(previous["stats"], report["stats"],
+                           previous["energy"]["watts"], report["energy"]["watts"])
+        st.session_state.profile_diff = (previous, report, diff)
+
+    st.markdown('''
+    <div class="section-header">
+        <div class="section-icon">🔀</div>
+        <h2 class="section-title">What Changed</h2>
+        <div class="section-divider"></div>
+    </div>
+    ''', unsafe_allow_html=True)
+    col1, col2, col3, col4 = st.columns(4)
+    col1.metric("Function energy", f"{diff.total_delta():+.4f} J")
+    col2.metric("Moved", len(diff.moved()))
+    col3.metric("New", len(diff.added()))
+    col4.metric("Gone", len(diff.removed()))
+
+    rows = diff.regressions(top) + diff.wins(top)
+    if not rows:
+        st.info("No function's energy changed since the previous analysis")
+        return
+    rows.sort(key=diff.delta)
+    dark_mode = st.session_state.get("dark_mode", True)
+    text_color = "#ffffff" if dark_mode else "#1a1c2e"
+    grid_color = "rgba(255, 255, 255, 0.1)" if dark_mode else "rgba(0, 0, 0, 0.05)"
+    fig = go.Figure(go.Bar(
+        y=[format_key(diff.key(row)) for row in rows], x=[diff.delta(row) for row in rows], orientation="h",
+        marker_color=["#dc2626" if diff.delta(row) > 0 else "#059669" for row in rows],
+        customdata=[(row[2], row[3], row[4], row[5]) for row in rows],
+        hovertemplate="%{y}<br>%{x:+.4f} J<br>calls %{customdata[0]} → %{customdata[1]}"
+                      "<br>self time %{customdata[2]:.4f} s → %{customdata[3]:.4f} s<extra></extra>"
+    ))
+    fig.update_layout(
+        height=max(300, len(rows) * 30),
+        paper_bgcolor='rgba(0,0,0,0)', plot_bgcolor='rgba(0,0,0,0)',
+        font=dict(family="Inter", color=text_color),
+        margin=dict(l=0, r=0, t=10, b=0),
+        xaxis=dict(title="Δ Joules", gridcolor=grid_color, zeroline=True, zerolinecolor=grid_color),
+        yaxis=dict(gridcolor=grid_color)
+    )
+    st.plotly_chart(fig, use_container_width=True)
+    st.caption("Self energy of each function against the previous analysis in this session; red grew, green shrank. "
+               "Functions whose line moved after an edit are matched by file and name.")
+
+def display_benchmark_summary(benchmark):
+    """Median, p95 and bootstrap confidence interval of energy across the measured runs."""
+    from benchmark import summarize
+    summary = summarize(benchmark["energies"])
+    col1, col2, col3 = st.columns(3)
+    col1.metric("Median energy", f"{summary['median']:.4f} J")
+    col2.metric("p95 energy", f"{summary['p95']:.4f} J")
+    col3.metric("95% CI of median", f"{summary['ci_low']:.4f}–{summary['ci_high']:.4f} J")
+    st.caption(
+        f"{benchmark['runs']} measured runs after {benchmark['warmup']} warmup runs; "
+        f"median wall time {summarize(benchmark['wall_times'])['median']:.3f}s"
+    )
+
+def display_chart(functions, energies, flame=None, key=None):
+    import pandas as pd
+    import plotly.express as px
+    import plotly.graph_objects as go
     dark_mode = st.session_state.get("dark_mode", True)
     
     col1, col2 = st.columns([1, 1])
@@ -393,7 +662,8 @@ def display_chart(functions, energies):
         </div>
         ''', unsafe_allow_html=True)
     with col2:
-        view_type = st.radio("View Type", ["Bar Chart", "Tree Map"], horizontal=True, label_visibility="collapsed")
+        views = ["Bar Chart", "Tree Map"] + (["Icicle"] if flame else [])
+        view_type = st.radio("View Type", views, horizontal=True, label_visibility="collapsed", key=key)
 
     if not functions:
         st.info("No function data available")
@@ -417,6 +687,20 @@ def display_chart(functions, energies):
             coloraxis_showscale=False,
             xaxis=dict(gridcolor=grid_color), yaxis=dict(gridcolor=grid_color)
         )
+    elif view_type == "Icicle":
+        fig = go.Figure(go.Icicle(
+            ids=flame["ids"], labels=flame["labels"], parents=flame["parents"], values=flame["values"],
+            branchvalues="total",
+            marker=dict(colors=flame["values"], colorscale=['#d1fae5', '#10b981', '#065f46']),
+            hovertemplate="%{label}<br>%{value:.4f} J inclusive<extra></extra>",
+            tiling=dict(orientation="v")
+        ))
+        fig.update_layout(
+            height=500,
+            paper_bgcolor='rgba(0,0,0,0)', plot_bgcolor='rgba(0,0,0,0)',
+            font=dict(family="Inter", color=text_color),
+            margin=dict(l=0, r=0, t=10, b=0)
+        )
     else:
         fig = px.treemap(
             df, path=['Function'], values='Energy (Joules)',
@@ -433,7 +717,161 @@ def display_chart(functions, energies):
     
     st.plotly_chart(fig, use_container_width=True)
 
-def display_detailed_stats(stats):
+def display_energy_source(energy):
+    """Says where the joules shown came from: the host's RAPL counters, the power model or a fixed estimate."""
+    if energy["source"] == "rapl":
+        domains = ", ".join(f"{label}: {j:.3f} J" for label, j in sorted(energy["domains"].items()))
+        st.caption(f"⚡ RAPL measured {energy['joules']:.3f} J for the whole host ({domains}); the total above "
+                   f"is this run's estimated share of it, {energy['watts']:.1f} W per profiled second")
+    elif energy["source"] == "power_model":
+        st.caption(f"🧮 Modelled {energy['joules']:.3f} J for the whole machine from per-core utilization and "
+                   f"frequency ({energy['machine']} profile); the total above is this run's estimated share of it, "
+                   f"{energy['watts']:.1f} W per profiled second — RAPL energy counters are not readable on this host")
+    elif energy["source"] == "imported":
+        st.caption(f"📥 Estimated at {energy['watts']:.0f} W per profiled second — "
+                   f"no power was measured where the profiles were recorded")
+    elif energy["source"] == "agent":
+        st.caption(f"📡 Estimated at {energy['watts']:.0f} W per CPU second the services used — "
+                   f"functions are charged the CPU time sampled in them")
+    else:
+        st.caption(f"⚙️ Estimated at {energy['watts']:.0f} W — RAPL energy counters are not readable on this host")
+
+def display_time_split(report):
+    """How much of the run was spent on the CPU and how much waiting, and what the waiting was charged."""
+    if not report or report["energy"].get("clock") != "cpu":
+        return
+    energy = report["energy"]
+    waiting = max(report["wall_time"] - sum(data[2] for data in report["stats"].values()), 0.0)
+    st.caption(f"⏱️ {report['cpu_time']:.3f} s CPU of {report['wall_time']:.3f} s wall — "
+               f"{waiting:.3f} s waiting (sleep, I/O, locks) charged {energy['idle_joules']:.3f} J "
+               f"at {energy['idle_watts']:.1f} W per process")
+
+def display_allocations(memory, top=10):
+    """The functions holding the most memory at the run's peak, with the DRAM energy estimate."""
+    import plotly.graph_objects as go
+    st.markdown('''
+    <div class="section-header">
+        <div class="section-icon">🧠</div>
+        <h2 class="section-title">Memory Hotspots</h2>
+        <div class="section-divider"></div>
+    </div>
+    ''', unsafe_allow_html=True)
+
+    if not memory:
+        st.info("Turn on \"Memory allocations\" in the sidebar to see which functions hold memory.")
+        return
+
+    col1, col2, col3 = st.columns(3)
+    col1.metric("Peak traced memory", f"{memory['peak'] / 1e6:.1f} MB")
+    col2.metric("Still held at exit", f"{sum(v[2] for v in memory['functions'].values()) / 1e6:.1f} MB")
+    col3.metric("DRAM energy", f"{memory['dram_joules']:.4f} J")
+
+    ranked = sorted(memory["functions"].items(), key=lambda kv: kv[1][0], reverse=True)[:top]
+    ranked = [(key, data) for key, data in ranked if data[0] or data[2]]
+    if not ranked:
+        st.info("No allocations were traced in your script")
+        return
+
+    dark_mode = st.session_state.get("dark_mode", True)
+    text_color = "#ffffff" if dark_mode else "#1a1c2e"
+    grid_color = "rgba(255, 255, 255, 0.1)" if dark_mode else "rgba(0, 0, 0, 0.05)"
+    labels = [format_key(key) for key, _ in ranked]
+    fig = go.Figure([
+        go.Bar(y=labels, x=[data[0] / 1e6 for _, data in ranked], name="Held at peak", orientation="h",
+               marker_color="#059669", customdata=[data[1] for _, data in ranked],
+               hovertemplate="%{y}<br>%{x:.2f} MB in %{customdata} blocks<extra></extra>"),
+        go.Bar(y=labels, x=[data[2] / 1e6 for _, data in ranked], name="Held at exit", orientation="h",
+               marker_color="#d97706", hovertemplate="%{y}<br>%{x:.2f} MB<extra></extra>"),
+    ])
+    fig.update_layout(
+        barmode="group", height=max(300, len(ranked) * 50),
+        paper_bgcolor='rgba(0,0,0,0)', plot_bgcolor='rgba(0,0,0,0)',
+        font=dict(family="Inter", color=text_color),
+        margin=dict(l=0, r=0, t=10, b=0), legend=dict(orientation="h"),
+        xaxis=dict(title="MB", gridcolor=grid_color), yaxis=dict(gridcolor=grid_color, autorange="reversed")
+    )
+    st.plotly_chart(fig, use_container_width=True)
+    st.caption(f"DRAM energy charges {DRAM_WATTS_PER_GB} W per GB for the traced memory over the run. "
+               "Memory tracking slows allocation-heavy code, and that overhead is in the CPU figures.")
+
+def display_timeline(timeline):
+    """Plots the resource samples taken while the script ran: CPU, memory, I/O and (if measured) power."""
+    import numpy as np
+    import plotly.graph_objects as go
+    from plotly.subplots import make_subplots
+    st.markdown('''
+    <div class="section-header">
+        <div class="section-icon">📈</div>
+        <h2 class="section-title">Resource Timeline</h2>
+        <div class="section-divider"></div>
+    </div>
+    ''', unsafe_allow_html=True)
+
+    if not timeline or len(timeline["t"]) < 2:
+        st.info("The run finished before enough samples were taken; lower the sampling interval to see a timeline.")
+        return
+
+    dark_mode = st.session_state.get("dark_mode", True)
+    text_color = "#ffffff" if dark_mode else "#1a1c2e"
+    grid_color = "rgba(255, 255, 255, 0.1)" if dark_mode else "rgba(0, 0, 0, 0.05)"
+
+    t = np.asarray(timeline["t"])
+    dt = np.maximum(np.diff(t), 1e-9)
+    per_core = np.asarray(timeline["cpu_per_core"])
+    has_power = len(timeline["joules"]) == len(t)
+    titles = ["CPU (%)", "Memory (MB)", "I/O (MB/s) & context switches (/s)"] + (["Power (W)"] if has_power else [])
+
+    fig = make_subplots(rows=len(titles), cols=1, shared_xaxes=True, subplot_titles=titles, vertical_spacing=0.08)
+    fig.add_trace(go.Scatter(x=t, y=timeline["process_cpu"], name="Process CPU", line=dict(color="#10b981")), row=1, col=1)
+    if len(per_core):
+        fig.add_trace(go.Scatter(x=t, y=per_core.mean(axis=0), name="Mean core", line=dict(color="#34d399", dash="dot")), row=1, col=1)
+        fig.add_trace(go.Scatter(x=t, y=per_core.max(axis=0), name="Busiest core", line=dict(color="#d97706", dash="dot")), row=1, col=1)
+    fig.add_trace(go.Scatter(x=t, y=np.asarray(timeline["rss"]) / 1e6, name="RSS", line=dict(color="#059669")), row=2, col=1)
+    fig.add_trace(go.Scatter(x=t[1:], y=np.diff(timeline["read_bytes"]) / dt / 1e6, name="Read", line=dict(color="#047857")), row=3, col=1)
+    fig.add_trace(go.Scatter(x=t[1:], y=np.diff(timeline["write_bytes"]) / dt / 1e6, name="Write", line=dict(color="#dc2626")), row=3, col=1)
+    ctx = np.diff(np.asarray(timeline["ctx_voluntary"]) + np.asarray(timeline["ctx_involuntary"])) / dt
+    fig.add_trace(go.Scatter(x=t[1:], y=ctx, name="Context switches", line=dict(color="#64748b", dash="dot")), row=3, col=1)
+    if has_power:
+        fig.add_trace(go.Scatter(x=t[1:], y=np.diff(timeline["joules"]) / dt, name="Power", line=dict(color="#991b1b")), row=4, col=1)
+
+    fig.update_layout(
+        height=220 * len(titles),
+        paper_bgcolor='rgba(0,0,0,0)', plot_bgcolor='rgba(0,0,0,0)',
+        font=dict(family="Inter", color=text_color),
+        margin=dict(l=0, r=0, t=30, b=0),
+        legend=dict(orientation="h")
+    )
+    fig.update_xaxes(gridcolor=grid_color)
+    fig.update_yaxes(gridcolor=grid_color)
+    fig.update_xaxes(title_text="Seconds", row=len(titles), col=1)
+    st.plotly_chart(fig, use_container_width=True)
+
+def display_line_heatmap(code, lines, watts=CPU_POWER_WATTS):
+    """Per-line hits, time and energy next to the source, shaded by energy."""
+    import numpy as np
+    import pandas as pd
+    if not lines:
+        st.info("Turn on \"Line-level heatmap\" in the sidebar to see energy per line.")
+        return
+
+    source_lines = code.splitlines()
+    n = len(source_lines)
+    times = np.asarray(lines["times"][1:n + 1], dtype=np.float64)
+    df = pd.DataFrame({
+        "Line": np.arange(1, n + 1),
+        "Code": [l if len(l) <= 60 else l[:57] + "..." for l in source_lines],
+        "Hits": np.asarray(lines["hits"][1:n + 1], dtype=np.int64),
+        "Time (ms)": times * 1000,
+        "Energy (J)": times * watts,
+    })
+    styled = df.style.background_gradient(cmap="Greens", subset=["Energy (J)"]).format(
+        {"Time (ms)": "{:.3f}", "Energy (J)": "{:.6f}"}
+    )
+    st.dataframe(styled, use_container_width=True, hide_index=True, height=min(35 * n + 40, 700))
+
+def display_detailed_stats(frame):
+    import pandas as pd
+    from profile_frame import ProfileFrame
     st.markdown('''
     <div class="section-header">
         <div class="section-icon">📋</div>
@@ -442,20 +880,226 @@ def display_detailed_stats(stats):
     </div>
     ''', unsafe_allow_html=True)
     
-    if stats:
-        stats_df = []
-        for func, data in list(stats.items())[:20]:
-            stats_df.append({
-                "Function": str(func),
-                "Calls": data[0],
-                "Total Time": f"{data[1]:.4f}s",
-                "CPU Time": f"{data[3]:.4f}s",
-                "Energy": f"{estimate_energy(data[3]):.2f}J"
-            })
+    if len(frame):
+        top = frame.top(20)
+        stats_df = pd.DataFrame({
+            "Function": ProfileFrame.labels(top),
+            "Calls": top["calls"].to_numpy(),
+            "Self Time": [f"{t:.4f}s" for t in top["self_time"]],
+            "Inclusive Time": [f"{t:.4f}s" for t in top["inclusive_time"]],
+            "Self Energy": [f"{e:.2f}J" for e in top["self_energy"]],
+            "Inclusive Energy": [f"{e:.2f}J" for e in top["inclusive_energy"]]
+        })
         st.dataframe(stats_df, use_container_width=True, hide_index=True)
     else:
         st.info("No statistics available")
 
+def display_breakdown(breakdown, watts):
+    """Busy time and energy of the main thread and of every thread and child process the script started."""
+    import pandas as pd
+    if not breakdown or len(breakdown) < 2:
+        return
+    st.markdown('''
+    <div class="section-header">
+        <div class="section-icon">🧵</div>
+        <h2 class="section-title">Threads & Processes</h2>
+        <div class="section-divider"></div>
+    </div>
+    ''', unsafe_allow_html=True)
+
+    total = sum(unit["seconds"] for unit in breakdown) or 1.0
+    df = pd.DataFrame({
+        "Thread / Process": [unit["label"] for unit in breakdown],
+        "Kind": [unit["kind"] for unit in breakdown],
+        "Busy Time": [f"{unit['seconds']:.4f}s" for unit in breakdown],
+        "Energy": [f"{unit['seconds'] * watts:.2f}J" for unit in breakdown],
+        "Share": [f"{unit['seconds'] / total:.0%}" for unit in breakdown],
+        "Top Function": [format_key(unit["top"]) if unit["top"] else "" for unit in breakdown],
+    })
+    st.dataframe(df, use_container_width=True, hide_index=True)
+    kinds = {unit["kind"] for unit in breakdown}
+    if "sampled thread" in kinds:
+        st.caption("⚠️ Threads were sampled rather than profiled (Python 3.12+ allows one cProfile per process), "
+                   "so their busy time is elapsed time, waiting included")
+    if "unprofiled process" in kinds:
+        st.caption("⚠️ Spawned and forkserver child processes start a fresh interpreter and aren't profiled; "
+                   "their time is missing from this breakdown and from the functions above")
+
+def display_exports(frame):
+    """Download the full profile; only the selected format is serialized, once per run."""
+    from exports import FORMATS, available_formats, export_bytes
+    col_format, col_button = st.columns([1, 1])
+    with col_format:
+        fmt = st.selectbox("Export format", available_formats(), key="export_format", label_visibility="collapsed")
+    extension, mime, _ = FORMATS[fmt]
+
+    cached = st.session_state.get("export_cache")
+    if cached is None or cached[0] is not frame or cached[1] != fmt:
+        cached = (frame, fmt, export_bytes(frame, fmt))
+        st.session_state.export_cache = cached
+
+    with col_button:
+        st.download_button(f"📊 Export {fmt}", cached[2], file_name=f"profile.{extension}", mime=mime,
+                           key="dl2", use_container_width=True)
+
+def display_history():
+    """Energy trends across every recorded run of a script, and of one function within it."""
+    import pandas as pd
+    import plotly.express as px
+    st.markdown('''
+    <div class="section-header">
+        <div class="section-icon">🕰️</div>
+        <h2 class="section-title">Run History</h2>
+        <div class="section-divider"></div>
+    </div>
+    ''', unsafe_allow_html=True)
+
+    history = get_run_history()
+    scripts = history.scripts()
+    if not scripts:
+        st.info("No runs recorded yet")
+        return
+
+    names = [name for name, _, _ in scripts]
+    current = st.session_state.get("script_name")
+    script = st.selectbox(
+        "Script", names, index=names.index(current) if current in names else 0,
+        format_func=lambda n: f"{n} ({dict((s[0], s[1]) for s in scripts)[n]} runs)",
+        key="history_script"
+    )
+
+    dark_mode = st.session_state.get("dark_mode", True)
+    text_color = "#ffffff" if dark_mode else "#1a1c2e"
+    grid_color = "rgba(255, 255, 255, 0.1)" if dark_mode else "rgba(0, 0, 0, 0.05)"
+    layout = dict(
+        height=320,
+        paper_bgcolor='rgba(0,0,0,0)', plot_bgcolor='rgba(0,0,0,0)',
+        font=dict(family="Inter", color=text_color),
+        margin=dict(l=0, r=0, t=10, b=0),
+        xaxis=dict(gridcolor=grid_color), yaxis=dict(gridcolor=grid_color, title="Joules")
+    )
+
+    runs = pd.DataFrame(history.script_trend(script), columns=["id", "created_at", "total_energy", "wall_time", "script_hash"])
+    runs["created_at"] = pd.to_datetime(runs["created_at"], unit="s")
+    runs["version"] = runs["script_hash"].str[:8]
+    fig = px.line(runs, x="created_at", y="total_energy", markers=True, hover_data=["version", "wall_time"],
+                  color_discrete_sequence=["#10b981"])
+    fig.update_layout(**layout)
+    st.plotly_chart(fig, use_container_width=True)
+
+    functions = history.top_functions(script)
+    if functions:
+        func_key = st.selectbox("Function", functions, key="history_function")
+        trend = pd.DataFrame(history.function_trend(script, func_key),
+                             columns=["created_at", "Self energy", "Inclusive energy", "calls"])
+        trend["created_at"] = pd.to_datetime(trend["created_at"], unit="s")
+        fig = px.line(trend, x="created_at", y=["Self energy", "Inclusive energy"], markers=True,
+                      hover_data=["calls"], color_discrete_sequence=["#059669", "#d97706"])
+        fig.update_layout(**layout, legend=dict(orientation="h", title=None))
+        st.plotly_chart(fig, use_container_width=True)
+
+@st.cache_resource
+def get_collector():
+    """A collector inside this server, for when no standalone `python collector.py` is running."""
+    from collector import Collector
+    return Collector().start()
+
+PRODUCTION_SETUP = 'import agent\nagent.start(service="my-service")'
+
+def display_production():
+    """Continuous energy attribution from the agents in running services, read from the collector.
+
+    Nothing is read until the user connects, so sessions that never open
+    this tab don't poll the collector.
+    """
+    from agent import DEFAULT_ADDRESS
+    st.markdown('''
+    <div class="section-header">
+        <div class="section-icon">📡</div>
+        <h2 class="section-title">Production</h2>
+        <div class="section-divider"></div>
+    </div>
+    ''', unsafe_allow_html=True)
+    if not st.toggle(f"Connect to the collector on {DEFAULT_ADDRESS}", key="production_connected",
+                     on_change=lambda: st.session_state.pop("production_backoff", None)):
+        st.caption("Agents in your services report to the collector; connect to watch them here. "
+                   "Enable the agent in a service with:")
+        st.code(PRODUCTION_SETUP, language="python")
+        return
+    poll_production()
+
+@st.fragment(run_every=PRODUCTION_REFRESH)
+def poll_production():
+    """Reads the collector every PRODUCTION_REFRESH seconds; after a failed read, waits longer before each retry."""
+    import pandas as pd
+    import plotly.express as px
+    from agent import DEFAULT_ADDRESS
+    from collector import BUCKET_SECONDS, fetch_snapshot, service_report
+
+    backoff = st.session_state.get("production_backoff")  # (retry at, delay)
+    try:
+        if backoff and time.monotonic() < backoff[0]:
+            raise ConnectionRefusedError("waiting to retry")
+        snapshot = fetch_snapshot()
+        names = sorted(snapshot["services"])
+        if names:
+            service = st.selectbox("Service", names, key="production_service")
+            snapshot = fetch_snapshot(service=service)
+        st.session_state.pop("production_backoff", None)
+    except OSError:
+        if not backoff or time.monotonic() >= backoff[0]:
+            delay = min(backoff[1] * 2, PRODUCTION_MAX_BACKOFF) if backoff else PRODUCTION_REFRESH
+            st.session_state.production_backoff = (time.monotonic() + delay, delay)
+        st.info(f"No collector is listening on {DEFAULT_ADDRESS}. Run `python collector.py` next to your "
+                "services, or collect inside this dashboard.")
+        if st.button("Start collector here", key="start_collector"):
+            try:
+                get_collector()
+            except OSError as e:
+                st.error(f"Could not start the collector: {e}")
+            st.session_state.pop("production_backoff", None)
+            st.rerun()
+        st.code(PRODUCTION_SETUP, language="python")
+        return
+    if not names:
+        st.info(f"The collector on {DEFAULT_ADDRESS} is running; no service has reported yet. "
+                "Enable the agent in a service with:")
+        st.code(PRODUCTION_SETUP, language="python")
+        return
+
+    report = service_report(snapshot, service)
+    info = report["production"]
+    watts = report["energy"]["watts"]
+
+    col1, col2, col3, col4 = st.columns(4)
+    col1.metric("Active processes", f"{info['active']} of {len(info['processes'])}")
+    col2.metric("CPU time", f"{info['cpu_seconds']:.1f} s")
+    col3.metric("Energy", f"{report['energy']['joules']:.2f} J")
+    col4.metric("Agent overhead", f"{100 * info['agent_seconds'] / info['cpu_seconds']:.2f}%"
+                if info["cpu_seconds"] else "–")
+    display_energy_source(report["energy"])
+    if info["dropped"]:
+        st.warning(f"{info['dropped']} samples were dropped while agents couldn't reach the collector")
+
+    if len(info["series"]) > 1:
+        dark_mode = st.session_state.get("dark_mode", True)
+        series = pd.DataFrame(info["series"], columns=["time", "cpu"])
+        series["time"] = pd.to_datetime(series["time"], unit="s")
+        series["Watts"] = series["cpu"] / BUCKET_SECONDS * watts
+        fig = px.line(series, x="time", y="Watts", markers=True, color_discrete_sequence=["#10b981"])
+        fig.update_layout(
+            height=260,
+            paper_bgcolor='rgba(0,0,0,0)', plot_bgcolor='rgba(0,0,0,0)',
+            font=dict(family="Inter", color="#ffffff" if dark_mode else "#1a1c2e"),
+            margin=dict(l=0, r=0, t=10, b=0), xaxis=dict(title=None)
+        )
+        st.plotly_chart(fig, use_container_width=True)
+
+    frame = get_profile_frame(report, slot="production_frame")
+    functions, energies, _ = process_data(frame)
+    display_chart(functions, energies, CallGraph(report["stats"]).icicle(watts), key="production_view")
+    display_detailed_stats(frame)
+
 def display_tips():
     st.markdown('''
     <div class="section-header">
@@ -535,24 +1179,206 @@ def display_sustainability_impact():
         </div>
         ''', unsafe_allow_html=True)
 
+def live_settings():
+    """The sidebar's settings without repeated-run benchmarking, which is too slow for live feedback."""
+    return {k: v for k, v in get_profiler_settings().items() if not k.startswith("benchmark_")}
+
 def update_live_analysis():
-    if "live_code" in st.session_state and st.session_state.live_code.strip():
-        path = "live_temp.py"
-        with open(path, "w") as f:
-            f.write(st.session_state.live_code)
-        stats = run_profiler(path)
-        functions, energies, total_energy = process_data(stats)
-        st.session_state.live_stats = stats
-        st.session_state.live_functions = functions
-        st.session_state.live_energies = energies
-        st.session_state.live_total_energy = total_energy
+    """on_change of the live editor: only notes the edit; live_runner profiles it once edits pause."""
+    st.session_state.live_code = st.session_state.live_code_input
+    st.session_state.live_edited_at = time.monotonic()
+
+def show_live_report(code, report, changes=None):
+    st.session_state.live_profiled_code = code
+    st.session_state.live_report = report
+    st.session_state.live_changes = changes
+    functions, energies, total_energy = process_data(get_profile_frame(report, "live_profile_frame"))
+    if report:
+        total_energy = run_energy(report)
+    st.session_state.live_stats = report["stats"] if report else None
+    st.session_state.live_functions = functions
+    st.session_state.live_energies = energies
+    st.session_state.live_total_energy = total_energy
+
+def start_live_run(code):
+    """Profiles the editor's code in the background, cancelling any run of an older version.
+
+    Code with a syntax error is not run. If only comments or formatting
+    changed, the last measurements are reused with their line numbers moved.
+    Any other edit re-runs the whole script, since a function's cost depends
+    on how the rest of the program calls it; the AST diff only reports which
+    functions changed.
+    """
+    from profiler import submit_profiler_in_pool
+    st.session_state.live_started_code = code
+    st.session_state.live_error = None
+    job = st.session_state.pop("live_job", None)
+    if job:
+        get_profiler_pool().cancel(job[3])
+    if not code.strip():
+        show_live_report(code, None)
+        return
+    error = syntax_error(code)
+    if error:
+        st.session_state.live_error = f"Syntax error at {error} — showing the last run."
+        return
+
+    previous, report = st.session_state.get("live_profiled_code"), st.session_state.get("live_report")
+    if previous and report and not report.get("lines") and same_program(previous, code):
+        stats = remap_stats(report["stats"], report.get("script", session_script_path(LIVE_SCRIPT_NAME)),
+                            previous, code)
+        show_live_report(code, dict(report, stats=stats), {"reused": True})
+        return
+
+    changes = diff_functions(previous, code) if previous and previous.strip() else None
+    settings = live_settings()
+    key = cache_key(code, settings)
+    cached = get_result_cache().get(key)
+    if cached is not None:
+        show_live_report(code, cached, changes)
+        return
+    future = submit_profiler_in_pool(get_profiler_pool(), session_script_path(LIVE_SCRIPT_NAME), settings, code)
+    st.session_state.live_job = (code, key, settings, future, changes)
+
+def finish_live_job():
+    code, key, settings, future, changes = st.session_state.pop("live_job")
+    try:
+        report = marshal.loads(future.result())
+    except JobTimeoutError as e:
+        st.session_state.live_error = f"Profiling stopped: {e}"
+        return
+    except JobError as e:
+        st.session_state.live_error = f"Your code raised an error: {str(e).strip().splitlines()[-1]}"
+        return
+    store_report(key, code, settings, report, "Live Editor")
+    show_live_report(code, report, changes)
+
+def display_live_changes(changes):
+    if not changes:
+        return
+    if changes.get("reused"):
+        st.caption("Only comments or formatting changed — the last measurements were reused.")
+        return
+    edited = changes["changed"] + changes["added"]
+    parts = []
+    if edited:
+        parts.append("edited " + ", ".join(edited[:8]) + (" …" if len(edited) > 8 else ""))
+    if changes["removed"]:
+        parts.append("removed " + ", ".join(changes["removed"][:8]))
+    if changes["module"]:
+        parts.append("module-level code changed")
+    if parts:
+        st.caption(f"Re-ran the whole script after this edit: {'; '.join(parts)}. "
+                   f"{len(changes['unchanged'])} function(s) unchanged.")
+
+def live_runner():
+    """Polls for the live editor only while an edit is waiting to run or a run is in flight.
+
+    The placeholder counts as already run, so nothing is profiled (or
+    recorded in the history) until the user edits it.
+    """
+    st.session_state.setdefault("live_started_code", LIVE_PLACEHOLDER)
+    if ("live_job" in st.session_state
+            or st.session_state.get("live_code", "") != st.session_state.get("live_started_code")):
+        poll_live_run()
+    elif st.session_state.get("live_error"):
+        st.warning(st.session_state.live_error)
+
+@st.fragment(run_every=0.5)
+def poll_live_run():
+    """Starts a run once edits pause, and picks up its result, without blocking the page.
+
+    Every outcome ends in a full rerun, after which live_runner no longer
+    calls this fragment and its timer stops.
+    """
+    code = st.session_state.get("live_code", "")
+    quiet = time.monotonic() - st.session_state.get("live_edited_at", 0.0)
+    if code != st.session_state.get("live_started_code") and quiet >= LIVE_DEBOUNCE:
+        start_live_run(code)
+        if "live_job" not in st.session_state:
+            st.rerun()  # answered without a run: redraw the results
+    job = st.session_state.get("live_job")
+    if job and job[3].done():
+        finish_live_job()
+        st.rerun()
+    st.caption("⏳ Profiling your latest edit…")
+
+def display_verification(result):
+    """Verdict of the measured A/B run of the original script against the AI suggestion."""
+    change = f"{result['energy_before']:.4f} J → {result['energy_after']:.4f} J ({result['energy_delta_pct']:+.1f}%)"
+    timing = f"{result['time_before']:.3f}s → {result['time_after']:.3f}s wall time"
+    if result["verdict"] == "behaviour_changed":
+        st.error("⚠️ The suggestion changes behaviour — do not apply it as is: " + "; ".join(result["problems"]))
+    elif result["verdict"] == "regressed":
+        st.warning(f"↑ The suggestion uses more energy: {change}, {timing}")
+    elif result["verdict"] == "improved":
+        st.success(f"✓ Verified: same behaviour, {change}, {timing}")
+    elif result["verdict"] == "inconclusive":
+        st.info(f"✓ Same behaviour; energy {change}, {timing} — one run each can't tell this from noise")
     else:
-        st.session_state.live_stats = None
-        st.session_state.live_functions = None
-        st.session_state.live_energies = None
-        st.session_state.live_total_energy = None
+        st.info(f"→ Same behaviour but no measurable energy change: {change}, {timing}")
+    if result["significant"] is None:
+        st.caption("Single run each — turn on the repeated-run benchmark for a significance test.")
+
+def hotspot_slice(code, path, stats):
+    """The hotspot excerpt to send instead of the whole file, for large scripts; None to send everything.
+
+    `path` is the name the script ran under, as recorded in the report.
+    """
+    if not path or not stats:
+        return None
+    hotspots = slice_hotspots(code, path, stats)
+    if hotspots:
+        st.caption(f"Sending the {len(hotspots.hotspots)} hottest functions and their dependencies "
+                   f"({hotspots.line_count} of {code.count(chr(10)) + 1} lines) to the model.")
+    return hotspots
+
+def request_ai_optimization(code, joules, slot, hotspots=None):
+    """Starts an optimization request in the background; its future is kept in session state under `slot`."""
+    client = get_ai_client()
+    if client is None:
+        st.error("AI suggestions are not configured: set GEMINI_API_KEY in the environment or Streamlit secrets.")
+        return
+    st.session_state[slot] = (code, client.submit(code, joules, hotspots))
+
+@st.fragment(run_every=1.0)
+def wait_for_ai(slot):
+    """Polls a pending request without blocking the page; reruns the app once it has finished."""
+    entry = st.session_state.get(slot)
+    if entry is None or entry[1].done():
+        st.rerun()
+    st.info("🤖 Analyzing code in the background — you can keep using the other tabs.")
+
+def ai_result(slot, code):
+    """(optimized code, advice) of the request for `code` once it has finished, else None."""
+    entry = st.session_state.get(slot)
+    if entry is None or entry[0] != code:
+        return None
+    future = entry[1]
+    if not future.done():
+        wait_for_ai(slot)
+        return None
+    if future.exception() is not None:
+        st.error(f"AI request failed: {future.exception()}")
+        return None
+    return future.result()
+
+def verify_suggestion(path, code, opt_code):
+    """Measured A/B result for a suggestion, computed once per suggestion and kept for reruns."""
+    from verify import verify_optimization
+    cached = st.session_state.get("ai_verification")
+    if cached and cached[0] == (path, opt_code):
+        return cached[1]
+    with st.spinner("Measuring the suggestion against your code..."):
+        try:
+            result = verify_optimization(get_profiler_pool(), path, opt_code, get_profiler_settings(), code)
+        except (JobTimeoutError, JobError) as e:
+            st.warning(f"Could not verify the suggestion: {str(e).splitlines()[-1]}")
+            return None
+    st.session_state.ai_verification = ((path, opt_code), result)
+    return result
 
-def display_ai_optimization(code, joules):
+def display_ai_optimization(code, joules, path=None, stats=None):
     st.markdown('''
     <div class="section-header">
         <div class="section-icon">🤖</div>
@@ -570,32 +1396,41 @@ def display_ai_optimization(code, joules):
     </div>
     ''', unsafe_allow_html=True)
     
+    hotspots = hotspot_slice(code, path, stats)
     if st.button("Generate Suggestions", type="primary", use_container_width=True):
-        with st.spinner("Analyzing code..."):
-            opt_code, full_advice = get_ai_optimization(code, joules)
+        request_ai_optimization(code, joules, "ai_request", hotspots)
+    
+    result = ai_result("ai_request", code)
+    if result is None:
+        return
+    opt_code, full_advice = result
+    if opt_code and full_advice:
+        st.success("✓ Analysis complete")
         
-        if opt_code and full_advice:
-            st.success("✓ Analysis complete")
-            
-            st.markdown('''
-            <div class="section-header" style="margin-top: 1rem;">
-                <div class="section-icon">📝</div>
-                <h2 class="section-title">Optimized Code</h2>
-                <div class="section-divider"></div>
-            </div>
-            ''', unsafe_allow_html=True)
-            st.code(opt_code, language="python")
-            
-            st.markdown('''
-            <div class="section-header">
-                <div class="section-icon">💬</div>
-                <h2 class="section-title">Recommendations</h2>
-                <div class="section-divider"></div>
-            </div>
-            ''', unsafe_allow_html=True)
-            st.markdown(full_advice)
-        else:
-            st.error("Unable to generate suggestions. Check API key.")
+        st.markdown('''
+        <div class="section-header" style="margin-top: 1rem;">
+            <div class="section-icon">📝</div>
+            <h2 class="section-title">Optimized Code</h2>
+            <div class="section-divider"></div>
+        </div>
+        ''', unsafe_allow_html=True)
+        st.code(opt_code, language="python")
+        
+        if path:
+            verification = verify_suggestion(path, code, opt_code)
+            if verification:
+                display_verification(verification)
+        
+        st.markdown('''
+        <div class="section-header">
+            <div class="section-icon">💬</div>
+            <h2 class="section-title">Recommendations</h2>
+            <div class="section-divider"></div>
+        </div>
+        ''', unsafe_allow_html=True)
+        st.markdown(full_advice)
+    else:
+        st.error("Unable to generate suggestions: the response contained no code.")
 
 def display_sidebar():
     with st.sidebar:
@@ -625,6 +1460,75 @@ def display_sidebar():
         
         st.markdown('</div>', unsafe_allow_html=True)
         
+        st.markdown('<div class="sidebar-section">', unsafe_allow_html=True)
+        st.markdown('<div class="sidebar-label">Profiler</div>', unsafe_allow_html=True)
+        mode = st.radio(
+            "Profiling mode",
+            ["cprofile", "sampling"],
+            format_func=lambda m: "Deterministic (cProfile)" if m == "cprofile" else "Statistical sampling",
+            key="profiler_mode",
+            help="Sampling adds almost no per-call overhead, so call-heavy code isn't over-charged"
+        )
+        if mode == "sampling":
+            st.select_slider(
+                "Stack sampling rate (Hz)",
+                options=[50, 100, 200, 500, 1000],
+                value=st.session_state.get("sample_rate_hz", 200),
+                key="sample_rate_hz"
+            )
+        st.toggle(
+            "Line-level heatmap",
+            key="line_profile",
+            help="Traces every line of your script; slower, and the tracing overhead is included in the run's energy"
+        )
+        st.toggle(
+            "Memory allocations",
+            key="memory_profile",
+            help="Traces allocations with tracemalloc and adds a DRAM energy term; slows allocation-heavy code"
+        )
+        if st.toggle("Repeated-run benchmark", key="benchmark_mode",
+                     help="Runs the script several times and reports median/p95 energy with confidence intervals"):
+            st.slider("Measured runs", 3, 50, value=st.session_state.get("benchmark_runs", 10), key="benchmark_runs")
+            st.slider("Warmup runs", 0, 10, value=st.session_state.get("benchmark_warmup", 2), key="benchmark_warmup")
+        default_machine, profiles = load_profiles()
+        machine = st.session_state.get("machine_profile", default_machine)
+        st.selectbox(
+            "Machine profile",
+            sorted(profiles),
+            index=sorted(profiles).index(machine if machine in profiles else default_machine),
+            key="machine_profile",
+            format_func=lambda name: f"{name} — {profiles[name].get('description', '')}",
+            help="Power curve used to model energy where RAPL counters can't be read (power_profiles.json)"
+        )
+        st.radio(
+            "Function timing",
+            ["cpu", "wall"],
+            index=["cpu", "wall"].index(st.session_state.get("profiler_clock", "cpu")),
+            key="profiler_clock",
+            format_func=lambda clock: {"cpu": "CPU time", "wall": "Wall time"}[clock],
+            horizontal=True,
+            help="CPU time charges functions only while they compute; waiting (sleep, I/O, locks) "
+                 "is charged separately at a small per-process baseline. Wall time charges functions "
+                 "for their waiting too."
+        )
+        st.number_input(
+            "Power while waiting (W)",
+            min_value=0.0,
+            value=st.session_state.get("idle_watts"),
+            step=0.5,
+            key="idle_watts",
+            placeholder=f"{IDLE_POWER_WATTS} W per process",
+            help="Baseline power charged for wall time the script spends off the CPU. The machine "
+                 "draws its idle power either way, so a waiting process is charged only its own share"
+        )
+        st.select_slider(
+            "Resource sampling interval (ms)",
+            options=[20, 50, 100, 250, 500, 1000],
+            value=st.session_state.get("sample_interval_ms", 100),
+            key="sample_interval_ms"
+        )
+        st.markdown('</div>', unsafe_allow_html=True)
+        
         st.markdown('<div class="sidebar-section">', unsafe_allow_html=True)
         st.markdown('<div class="sidebar-label">Actions</div>', unsafe_allow_html=True)
         
@@ -647,26 +1551,79 @@ def display_sidebar():
         ''', unsafe_allow_html=True)
         st.markdown('</div>', unsafe_allow_html=True)
 
+def display_imported_profile(report):
+    """Overview and details of merged cProfile dumps; nothing ran here, so there is no code, AI or live tab."""
+    imported = report["imported"]
+    st.success(f"✓ Merged {imported['files']} profile(s) from {report['script']}")
+    if imported["skipped"]:
+        names = ", ".join(os.path.basename(name) for name, _ in imported["skipped"][:5])
+        more = f" and {len(imported['skipped']) - 5} more" if len(imported["skipped"]) > 5 else ""
+        st.warning(f"Skipped {len(imported['skipped'])} file(s) that aren't cProfile dumps: {names}{more}")
+
+    tab1, tab2, tab3 = st.tabs(["Overview", "Details", "Impact"])
+    energy = report["energy"]
+    frame = get_profile_frame(report)
+    functions, energies, total_energy = process_data(frame)
+    st.session_state.stats = report["stats"]
+
+    with tab1:
+        st.markdown('''
+        <div class="section-header">
+            <div class="section-icon">⚡</div>
+            <h2 class="section-title">Sustainability Dashboard</h2>
+            <div class="section-divider"></div>
+        </div>
+        ''', unsafe_allow_html=True)
+        col_score, col_metrics = st.columns([1, 2])
+        with col_score:
+            display_sustainability_score(total_energy)
+        with col_metrics:
+            display_energy_metrics(total_energy)
+            display_energy_source(energy)
+        display_profile_diff(previous_report(report), report)
+        display_chart(functions, energies, CallGraph(report["stats"]).icicle(energy["watts"]))
+
+    with tab2:
+        display_detailed_stats(frame)
+        display_exports(frame)
+
+    with tab3:
+        display_sustainability_impact()
+        display_tips()
+
 def main_ui():
     display_sidebar()
     display_header()
     
     path, code = handle_file_upload()
-    
-    if path and code:
+    imported = None if path else handle_profile_import()
+
+    if imported:
+        display_imported_profile(imported)
+    elif path and code:
         st.session_state.code = code
         
-        tab1, tab2, tab3, tab4, tab5, tab6 = st.tabs([
+        tab1, tab2, tab3, tab4, tab5, tab6, tab7, tab8 = st.tabs([
             "Overview", 
             "Details", 
             "Impact", 
             "AI Optimize", 
             "Code", 
-            "Live Editor"
+            "Live Editor",
+            "History",
+            "Production"
         ])
         
-        stats = run_analysis(path)
-        functions, energies, total_energy = process_data(stats)
+        report = run_analysis(path, code, st.session_state.get("script_name", "script.py"))
+        stats = report["stats"] if report else {}
+        energy = report["energy"] if report else {"source": "model", "domains": {}, "watts": CPU_POWER_WATTS}
+        watts = energy["watts"]
+        frame = get_profile_frame(report)
+        functions, energies, total_energy = process_data(frame)
+        if report:
+            total_energy = run_energy(report)
+        benchmark = report.get("benchmark") if report else None
+        memory = report.get("memory") if report else None
         st.session_state.stats = stats
         
         with tab1:
@@ -684,27 +1641,32 @@ def main_ui():
                 display_sustainability_score(total_energy)
             with col_metrics:
                 display_energy_metrics(total_energy)
+                display_energy_source(energy)
+                display_time_split(report)
             
-            display_energy_reduction(total_energy)
-            display_chart(functions, energies)
+            if benchmark:
+                display_benchmark_summary(benchmark)
+            display_energy_reduction(total_energy, benchmark["energies"] if benchmark else None)
+            display_profile_diff(previous_report(report), report)
+            display_chart(functions, energies, CallGraph(stats).icicle(watts))
+            display_allocations(memory)
+            display_timeline(report["timeline"] if report else None)
             
             # Enhanced report download
-            report_text = f"ENERGY SUSTAINABILITY REPORT\n" + "="*30 + f"\nGrade: {calculate_grade(total_energy)[0]}\nTotal Energy: {total_energy:.4f} Joules\nCPU Time: {total_energy/30:.4f} s\nCO2: {total_energy*0.0004:.6f} g\n\nFUNCTION BREAKDOWN:\n" + "\n".join([f"• {f}: {e:.4f} J" for f, e in zip(functions, energies)])
+            report_text = f"ENERGY SUSTAINABILITY REPORT\n" + "="*30 + f"\nGrade: {calculate_grade(total_energy)[0]}\nTotal Energy: {total_energy:.4f} Joules\nCPU Time: {report['cpu_time'] if report else 0.0:.4f} s\nWall Time: {report['wall_time'] if report else 0.0:.4f} s\nCO2: {total_energy*0.0004:.6f} g\n\nFUNCTION BREAKDOWN:\n" + "\n".join([f"• {f}: {e:.4f} J" for f, e in zip(functions, energies)])
             st.download_button("📥 Export Full Report", report_text, file_name="sustainability_report.txt", key="dl1")
         
         with tab2:
-            display_detailed_stats(stats)
-            csv = "Function,Calls,Total,CPU,Energy\n"
-            for func, data in stats.items():
-                csv += f"{func},{data[0]},{data[1]:.4f},{data[3]:.4f},{estimate_energy(data[3]):.2f}\n"
-            st.download_button("📊 Export CSV", csv, file_name="data.csv", key="dl2")
+            display_detailed_stats(frame)
+            display_breakdown(report.get("breakdown") if report else None, watts)
+            display_exports(frame)
         
         with tab3:
             display_sustainability_impact()
             display_tips()
         
         with tab4:
-            display_ai_optimization(code, total_energy)
+            display_ai_optimization(code, total_energy, report.get("script", path) if report else path, stats)
         
         with tab5:
             st.markdown('''
@@ -714,7 +1676,11 @@ def main_ui():
                 <div class="section-divider"></div>
             </div>
             ''', unsafe_allow_html=True)
-            st.code(code, language="python")
+            col_code, col_heat = st.columns([1, 1])
+            with col_code:
+                st.code(code, language="python", line_numbers=True)
+            with col_heat:
+                display_line_heatmap(code, report.get("lines") if report else None, watts)
             st.download_button("📥 Download", code, file_name="source.py", key="dl3")
         
         with tab6:
@@ -734,21 +1700,28 @@ def main_ui():
             
             live_code = st.text_area(
                 "Code",
-                value=st.session_state.get("live_code", "# Enter Python code\nprint('Hello')"),
+                value=st.session_state.get("live_code", LIVE_PLACEHOLDER),
                 height=250,
                 key="live_code_input",
                 on_change=update_live_analysis,
                 label_visibility="collapsed"
             )
             st.session_state.live_code = live_code
+            live_runner()
             
             if st.session_state.get("live_total_energy"):
+                display_live_changes(st.session_state.get("live_changes"))
                 display_energy_metrics(st.session_state.live_total_energy)
                 display_chart(st.session_state.live_functions, st.session_state.live_energies)
                 
                 if st.button("🤖 Optimize", key="live_ai", use_container_width=True):
-                    with st.spinner("Analyzing..."):
-                        opt_code, advice = get_ai_optimization(live_code, st.session_state.live_total_energy)
+                    live_report = st.session_state.get("live_report") or {}
+                    hotspots = hotspot_slice(live_code, live_report.get("script"), st.session_state.get("live_stats"))
+                    request_ai_optimization(live_code, st.session_state.live_total_energy, "live_ai_request",
+                                            hotspots)
+                result = ai_result("live_ai_request", live_code)
+                if result is not None:
+                    opt_code, advice = result
                     if opt_code:
                         st.success("✓ Complete")
                         st.code(opt_code, language="python")
@@ -756,16 +1729,26 @@ def main_ui():
                         st.markdown(advice)
                     else:
                         st.error("Failed")
+        
+        with tab7:
+            display_history()
+
+        with tab8:
+            display_production()
     else:
-        st.markdown('''
-        <div class="empty-state">
-            <div class="empty-icon">📁</div>
-            <h3 class="empty-title">No file uploaded</h3>
-            <p class="empty-description">
-                Upload a Python file to analyze its energy consumption and get optimization suggestions.
-            </p>
-        </div>
-        ''', unsafe_allow_html=True)
+        tab1, tab2 = st.tabs(["Upload", "Production"])
+        with tab1:
+            st.markdown('''
+            <div class="empty-state">
+                <div class="empty-icon">📁</div>
+                <h3 class="empty-title">No file uploaded</h3>
+                <p class="empty-description">
+                    Upload a Python file to analyze its energy consumption and get optimization suggestions.
+                </p>
+            </div>
+            ''', unsafe_allow_html=True)
+        with tab2:
+            display_production()
     
     dark_mode = st.session_state.get("dark_mode", True)
     theme_label = "🌙 Dark Mode" if dark_mode else "☀️ Light Mode"
@@ -0,0 +1,85 @@
+"""A/B verification of AI-suggested code: same behaviour, and measurably less energy?"""
+import os
+from benchmark import run_benchmark_in_pool, compare
+from energy import run_energy
+from profiler import run_profiler_in_pool
+
+
+def _same(before, after):
+    if "value" in before and "value" in after:
+        # repr too: NaN isn't equal to itself, and equal sets can print in a different order
+        return before["value"] == after["value"] or repr(before["value"]) == repr(after["value"])
+    return before.get("repr", repr(before.get("value"))) == after.get("repr", repr(after.get("value")))
+
+
+def compare_outcomes(before, after):
+    """Differences between two runs' captured behaviour; an empty list means equivalent."""
+    problems = []
+    if before["error"] != after["error"]:
+        problems.append(f"exception changed: {before['error'] or 'none'} → {after['error'] or 'none'}")
+    if before["stdout"] != after["stdout"]:
+        problems.append("printed output differs")
+    # Only names both versions define: a rewrite may legitimately drop loop variables and temporaries.
+    changed = sorted(name for name in before["state"].keys() & after["state"].keys()
+                     if not _same(before["state"][name], after["state"][name]))
+    if changed:
+        shown = ", ".join(changed[:10]) + (" …" if len(changed) > 10 else "")
+        problems.append(f"final values differ: {shown}")
+    return problems
+
+
+def _profile_both(pool, scripts, settings):
+    # One after the other: side by side, the runs would share the CPUs, caches and power they're compared on.
+    run = run_benchmark_in_pool if "benchmark_runs" in settings else run_profiler_in_pool
+    return [run(pool, path, settings, source) for path, source in scripts]
+
+
+def verify_optimization(pool, original_path, optimized_code, settings=None, original_code=None):
+    """Profiles the original script and then the suggestion, and compares them.
+
+    Both run with stdout captured; their output, final globals and exceptions
+    must match for the suggestion to count as behaviour-preserving. With
+    benchmark settings, the energy change is tested for significance and
+    only a significant change counts; a single run each can't tell a real
+    change from noise, so its energy verdict is "inconclusive". `verdict` is
+    one of "behaviour_changed", "regressed", "improved", "no_change" or
+    "inconclusive".
+
+    Both versions run in memory: the suggestion under a name next to
+    `original_path`, and the original from `original_code` if given, else
+    from the file.
+    """
+    settings = dict(settings or {}, capture_output=True)
+    root, ext = os.path.splitext(original_path)
+    optimized_path = f"{root}.optimized{ext or '.py'}"
+    before, after = _profile_both(pool, [(original_path, original_code), (optimized_path, optimized_code)],
+                                  settings)
+
+    problems = compare_outcomes(before["outcome"], after["outcome"])
+    energy_before, energy_after = run_energy(before), run_energy(after)
+    if "benchmark" in before:
+        significance = compare(before["benchmark"]["energies"], after["benchmark"]["energies"])
+        significant = significance["significant"]
+    else:
+        significant = None
+
+    delta = energy_after - energy_before
+    if problems:
+        verdict = "behaviour_changed"
+    elif significant is None:
+        verdict = "inconclusive"
+    elif not significant:
+        verdict = "no_change"
+    else:
+        verdict = "improved" if delta < 0 else "regressed"
+
+    return {
+        "verdict": verdict,
+        "problems": problems,
+        "energy_before": energy_before,
+        "energy_after": energy_after,
+        "energy_delta_pct": delta / energy_before * 100 if energy_before else 0.0,
+        "time_before": before["wall_time"],
+        "time_after": after["wall_time"],
+        "significant": significant,
+    }
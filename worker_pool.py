@@ -0,0 +1,258 @@
+"""Pre-forked worker processes that run profiling jobs outside the Streamlit server."""
+import atexit, importlib, math, multiprocessing, os, queue, signal, threading, time, traceback
+from concurrent.futures import Future
+
+try:
+    import resource
+except ImportError:  # not available on Windows; CPU limits are skipped there
+    resource = None
+
+DEFAULT_WALL_TIMEOUT = 60  # seconds a job may run before its worker is killed
+DEFAULT_CPU_TIMEOUT = 30   # CPU seconds a job may burn before SIGXCPU stops it
+STARTUP_TIMEOUT = 60       # seconds a new worker may take to import its preload modules
+CANCEL_POLL_INTERVAL = 0.05  # how often a running job checks whether it was cancelled
+
+
+class JobTimeoutError(Exception):
+    """Raised when a job exceeds its wall-clock or CPU time budget."""
+
+
+class JobError(Exception):
+    """Raised when a job fails inside a worker; carries the remote traceback."""
+
+
+class JobCancelledError(Exception):
+    """Raised when a job was cancelled while it was running."""
+
+
+class _CpuLimitExceeded(BaseException):
+    # BaseException so a bare `except Exception` in user code cannot swallow it.
+    pass
+
+
+def _on_cpu_limit(signum, frame):
+    raise _CpuLimitExceeded()
+
+
+def _set_cpu_limit(cpu_timeout):
+    if resource is None or not cpu_timeout:
+        return
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    used = usage.ru_utime + usage.ru_stime
+    _, hard = resource.getrlimit(resource.RLIMIT_CPU)
+    soft = math.ceil(used + cpu_timeout)
+    if hard != resource.RLIM_INFINITY:
+        soft = min(soft, hard)
+    resource.setrlimit(resource.RLIMIT_CPU, (soft, hard))
+
+
+def _clear_cpu_limit():
+    if resource is None:
+        return
+    _, hard = resource.getrlimit(resource.RLIMIT_CPU)
+    resource.setrlimit(resource.RLIMIT_CPU, (hard, hard))
+
+
+def _worker_main(conn, preload=()):
+    """Worker loop: receive (fn, args, kwargs, cpu_timeout), send back (status, payload)."""
+    signal.signal(signal.SIGINT, signal.SIG_IGN)  # the parent owns Ctrl+C
+    # Scripts may start processes of their own: give them the platform's default start method
+    # rather than the one this worker inherited, allow it despite the daemon flag, and lead a
+    # process group so a killed job takes its children down with it.
+    multiprocessing.set_start_method(None, force=True)
+    multiprocessing.current_process().daemon = False
+    if hasattr(os, "setpgid"):
+        os.setpgid(0, 0)
+    if resource is not None:
+        signal.signal(signal.SIGXCPU, _on_cpu_limit)
+    for module in preload:
+        importlib.import_module(module)
+    conn.send(("ready", None))
+
+    while True:
+        try:
+            job = conn.recv()
+        except (EOFError, OSError):
+            break
+        if job is None:
+            break
+
+        fn, args, kwargs, cpu_timeout = job
+        _set_cpu_limit(cpu_timeout)
+        try:
+            reply = ("ok", fn(*args, **kwargs))
+        except _CpuLimitExceeded:
+            reply = ("cpu_timeout", cpu_timeout)
+        except BaseException:
+            reply = ("error", traceback.format_exc())
+        finally:
+            _clear_cpu_limit()
+
+        try:
+            conn.send(reply)
+        except Exception:
+            conn.send(("error", traceback.format_exc()))
+
+
+def _default_start_method():
+    # forkserver avoids forking a multi-threaded Streamlit server; fall back to spawn.
+    methods = multiprocessing.get_all_start_methods()
+    return "forkserver" if "forkserver" in methods else "spawn"
+
+
+class ProfilerPool:
+    """A fixed set of pre-started worker processes fed from a shared job queue.
+
+    Each worker is owned by a dispatcher thread that hands it one job at a time,
+    enforces the wall-clock timeout and replaces the process if it hangs or dies.
+    Results travel back pickled over a pipe, so `fn`, its arguments and its
+    return value must be picklable and `fn` must be importable by the worker.
+    Modules named in `preload` are imported before a worker reports ready, so
+    their import time is not charged against the first job's wall-clock limit.
+    `cancel` stops queued jobs and kills the worker of a running one.
+    """
+
+    def __init__(self, workers=None, wall_timeout=DEFAULT_WALL_TIMEOUT,
+                 cpu_timeout=DEFAULT_CPU_TIMEOUT, start_method=None, preload=("profiler",)):
+        self.workers = workers or multiprocessing.cpu_count()
+        self.preload = tuple(preload)
+        self.wall_timeout = wall_timeout
+        self.cpu_timeout = cpu_timeout
+        self._ctx = multiprocessing.get_context(start_method or _default_start_method())
+        self._jobs = queue.Queue()
+        self._closed = False
+        self._cancelled = set()
+        self._slots = []
+        for i in range(self.workers):
+            slot = threading.Thread(target=self._run_slot, name=f"profiler-slot-{i}", daemon=True)
+            slot.start()
+            self._slots.append(slot)
+        atexit.register(self.shutdown)
+
+    def submit(self, fn, args=(), kwargs=None, wall_timeout=None, cpu_timeout=None):
+        """Queues a job and returns a Future for its result."""
+        if self._closed:
+            raise RuntimeError("ProfilerPool is shut down")
+        future = Future()
+        job = (fn, tuple(args), kwargs or {}, self.cpu_timeout if cpu_timeout is None else cpu_timeout)
+        wall = self.wall_timeout if wall_timeout is None else wall_timeout
+        self._jobs.put((future, job, wall))
+        return future
+
+    def run(self, fn, args=(), kwargs=None, wall_timeout=None, cpu_timeout=None):
+        """Runs a job and blocks until its result is available."""
+        return self.submit(fn, args, kwargs, wall_timeout, cpu_timeout).result()
+
+    def cancel(self, future):
+        """Cancels a queued or running job; returns False if it had already finished.
+
+        A running job's worker is killed and replaced, and its future fails
+        with JobCancelledError.
+        """
+        if future.cancel():
+            return True
+        if future.done():
+            return False
+        self._cancelled.add(future)
+        future.add_done_callback(self._cancelled.discard)  # runs at once if it finished meanwhile
+        return True
+
+    def shutdown(self):
+        if self._closed:
+            return
+        self._closed = True
+        for _ in self._slots:
+            self._jobs.put(None)
+
+    def _spawn(self):
+        parent_conn, child_conn = self._ctx.Pipe()
+        proc = self._ctx.Process(target=_worker_main, args=(child_conn, self.preload), daemon=True)
+        proc.start()
+        child_conn.close()
+        try:
+            ready = parent_conn.poll(STARTUP_TIMEOUT) and parent_conn.recv() == ("ready", None)
+        except (EOFError, OSError):
+            ready = False
+        if not ready:
+            self._kill(proc, parent_conn)
+            raise RuntimeError("worker process failed to start")
+        return proc, parent_conn
+
+    def _try_spawn(self):
+        try:
+            return self._spawn()
+        except Exception:
+            return None, None  # retried when the next job arrives
+
+    def _kill(self, proc, conn):
+        conn.close()
+        try:
+            os.killpg(proc.pid, signal.SIGKILL)  # the worker and any processes its job started
+        except (AttributeError, OSError):
+            proc.kill()
+        proc.join()
+
+    def _wait(self, conn, future, wall):
+        """Waits for a job's reply; returns the exception to fail it with if it must be stopped."""
+        deadline = time.monotonic() + wall
+        while not conn.poll(min(CANCEL_POLL_INTERVAL, max(deadline - time.monotonic(), 0))):
+            if future in self._cancelled:
+                return JobCancelledError("job was cancelled")
+            if time.monotonic() >= deadline:
+                return JobTimeoutError(f"job exceeded {wall}s wall-clock limit")
+        return None
+
+    def _run_slot(self):
+        proc, conn = self._try_spawn()  # pre-fork so the first job pays no startup cost
+        while True:
+            item = self._jobs.get()
+            if item is None:
+                break
+            future, job, wall = item
+            if not future.set_running_or_notify_cancel():
+                continue
+
+            if proc is None or not proc.is_alive():
+                if conn is not None:
+                    conn.close()
+                try:
+                    proc, conn = self._spawn()
+                except Exception as e:
+                    proc, conn = None, None
+                    future.set_exception(JobError(f"could not start a worker process: {e}"))
+                    continue
+
+            try:
+                conn.send(job)
+                stopped = self._wait(conn, future, wall)
+                if stopped:
+                    self._kill(proc, conn)
+                    proc, conn = self._try_spawn()
+                    future.set_exception(stopped)
+                    continue
+                status, payload = conn.recv()
+            except (EOFError, OSError):
+                self._kill(proc, conn)
+                proc, conn = self._try_spawn()
+                future.set_exception(JobError("worker process died while running the job"))
+                continue
+            except Exception as e:  # the job itself could not be pickled
+                future.set_exception(e)
+                continue
+
+            if status == "ok":
+                future.set_result(payload)
+            elif status == "cpu_timeout":
+                future.set_exception(JobTimeoutError(f"job exceeded {payload}s CPU limit"))
+            else:
+                future.set_exception(JobError(payload))
+
+        if proc is None:
+            return
+        try:
+            conn.send(None)
+        except OSError:
+            pass
+        proc.join(timeout=1)
+        if proc.is_alive():
+            proc.kill()